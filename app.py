@@ -1,21 +1,41 @@
+import time
+_SCRIPT_STARTED = time.perf_counter()  # Start of this run, before any heavy import
+
 import os
 import streamlit as st
-from weather_agent import WeatherAgent
-from database import WeatherHistoryDB
+from weather_agent import WeatherAgent, RequestContext
 from config import Config
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play
-import speech_recognition as sr
 import uuid
 from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List
+
+# Process-wide resources, created once and shared by every session and rerun.
+# Voice libraries are only imported when a voice feature is first used.
+@st.cache_resource
+def get_weather_agent() -> WeatherAgent:
+    return WeatherAgent()
+
+@st.cache_resource
+def get_eleven_client():
+    from elevenlabs.client import ElevenLabs
+    return ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
 
-# Initialize clients
-eleven_client = ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
-weather_agent = WeatherAgent()
-db = WeatherHistoryDB()
+weather_agent = get_weather_agent()
+db = weather_agent.db  # One storage layer per process; sessions share its bounded connection pool
+
+def report_startup_time():
+    """Log how long a session's first run took to become ready, flagging runs over the budget"""
+    elapsed = time.perf_counter() - _SCRIPT_STARTED
+    budget = Config.STARTUP_BUDGET_SECONDS
+    print(f"Startup: ready in {elapsed:.2f}s (budget {budget:.2f}s)")
+    if elapsed > budget:
+        print(f"⚠️ Startup exceeded its budget by {elapsed - budget:.2f}s")
 
 def speak_text(text: str):
-    audio_generator = eleven_client.text_to_speech.convert(
+    from elevenlabs import play
+    
+    audio_generator = get_eleven_client().text_to_speech.convert(
         text=text,
         voice_id="JBFqnCBsd6RMkjVDRZzb",
         model_id="eleven_multilingual_v2",
@@ -33,6 +53,8 @@ def speak_text(text: str):
     play(audio_generator)
 
 def get_voice_input() -> str:
+    import speech_recognition as sr
+    
     recognizer = sr.Recognizer()
     with sr.Microphone() as source:
         st.info("Listening... Please speak your weather query.")
@@ -44,9 +66,107 @@ def get_voice_input() -> str:
     except sr.RequestError as e:
         return f"Could not request results; {e}"
 
-def generate_chat_name(prompt: str) -> str:
-    """Generate a chat name from the first prompt"""
-    location, date = weather_agent.extract_location_and_date(prompt)
+def load_chat_page():
+    """Append the next page of chat summaries to the sidebar list"""
+    summaries, cursor = db.list_chats(cursor=st.session_state.chat_cursor)
+    for chat in summaries:
+        st.session_state.chats.setdefault(chat['chat_id'], {
+            'name': chat['chat_name'],
+            'created_at': chat['created_at'],
+            'archived': chat['archived']
+        })
+    st.session_state.chat_cursor = cursor
+
+def new_chat(chat_id: str):
+    """Register an empty, not yet persisted chat in the session"""
+    st.session_state.chats[chat_id] = {
+        'name': "New Chat",
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    cache_chat_messages(chat_id, [])
+
+def cache_chat_messages(chat_id: str, messages: List[Dict]):
+    """Keep a chat's messages in the session's bounded LRU of opened chats"""
+    bodies = st.session_state.chat_bodies
+    bodies[chat_id] = messages
+    bodies.move_to_end(chat_id)
+    while len(bodies) > Config.CHAT_BODY_CACHE_SIZE:
+        bodies.popitem(last=False)
+
+def get_chat_messages(chat_id: str) -> List[Dict]:
+    """Get a chat's messages, loading them from the database the first time the chat is opened"""
+    bodies = st.session_state.chat_bodies
+    if chat_id in bodies:
+        bodies.move_to_end(chat_id)
+        return bodies[chat_id]
+    messages = db.get_chat_messages(chat_id)  # Restores an archived chat into the hot tables
+    if chat_id in st.session_state.chats:
+        st.session_state.chats[chat_id]['archived'] = False
+    cache_chat_messages(chat_id, messages)
+    return messages
+
+def render_search_results(query: str):
+    """Show one page of ranked chat search results in the sidebar"""
+    if st.session_state.get("search_query") != query:
+        st.session_state.search_query = query
+        st.session_state.search_page = 0
+    page = st.session_state.search_page
+    page_size = Config.SEARCH_PAGE_SIZE
+    
+    # Fetch one extra hit to know whether a next page exists
+    hits = db.search_chats(query, limit=page_size + 1, offset=page * page_size)
+    if not hits:
+        st.caption("No matching chats.")
+        return
+    
+    for hit in hits[:page_size]:
+        if st.button(hit['chat_name'], key=f"search_{hit['chat_id']}", use_container_width=True):
+            st.session_state.chats.setdefault(hit['chat_id'], {
+                'name': hit['chat_name'],
+                'created_at': hit['created_at']
+            })
+            st.session_state.current_chat_id = hit['chat_id']
+            st.rerun()
+        st.caption(hit['snippet'])
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if page > 0 and st.button("◀ Previous", key="search_prev"):
+            st.session_state.search_page -= 1
+            st.rerun()
+    with col2:
+        if len(hits) > page_size and st.button("Next ▶", key="search_next"):
+            st.session_state.search_page += 1
+            st.rerun()
+
+def stream_response(prompt: str, request: RequestContext) -> str:
+    """Show the user's message and render the assistant's answer incrementally as it streams"""
+    with st.chat_message("user"):
+        st.markdown(prompt)
+    
+    with st.chat_message("assistant"):
+        status = st.empty()
+        answer = st.empty()
+        emoji, text = "", ""
+        for event in weather_agent.run_stream(prompt, request=request):
+            if event.kind == "status":
+                status.caption(event.text)
+                continue
+            if event.kind == "emoji":
+                emoji = event.text
+            elif event.kind == "replace":
+                text = event.text
+            else:
+                text += event.text
+            answer.markdown(emoji + text + "▌")
+        status.empty()
+        answer.markdown(emoji + text)
+    return emoji + text
+
+def generate_chat_name(request: RequestContext) -> str:
+    """Generate a chat name from the first prompt's parsed request"""
+    prompt = request.prompt
+    location, date = request.location, request.date
     if location and date:
         return f"Weather for {location} on {date}"
     elif location:
@@ -67,16 +187,18 @@ def main():
         st.session_state.renaming_chat = None
     if "new_chat_name" not in st.session_state:
         st.session_state.new_chat_name = ""
+    if "chat_bodies" not in st.session_state:
+        st.session_state.chat_bodies = OrderedDict()
 
-    # Load chats from database on first run
-    if not st.session_state.chats:
-        saved_chats = db.get_all_chats()
-        for chat in saved_chats:
-            st.session_state.chats[chat['chat_id']] = {
-                'name': chat['chat_name'],
-                'messages': chat['messages'],  # This now includes all messages
-                'created_at': chat['created_at']
-            }
+    # Load the first page of chat summaries on first run; messages load when a chat is opened
+    if "chat_cursor" not in st.session_state:
+        st.session_state.chat_cursor = None
+        load_chat_page()
+    if st.session_state.current_chat_id not in st.session_state.chats:
+        new_chat(st.session_state.current_chat_id)
+    if "startup_reported" not in st.session_state:
+        st.session_state.startup_reported = True
+        report_startup_time()
     # Sidebar with chat management
     with st.sidebar:
         st.subheader("Chat History")
@@ -84,14 +206,15 @@ def main():
         # Button to create new chat
         if st.button("➕ New Chat"):
             new_chat_id = str(uuid.uuid4())
-            st.session_state.chats[new_chat_id] = {
-                'name': "New Chat",
-                'messages': [],
-                'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            new_chat(new_chat_id)
             st.session_state.current_chat_id = new_chat_id
             st.rerun()
         
+        # Full-text search across chat names and messages
+        search_query = st.text_input("🔍 Search chats", key="chat_search")
+        if search_query.strip():
+            render_search_results(search_query.strip())
+        
         # List of available chats with rename functionality
         st.write("### Your Chats")
         for chat_id in sorted(
@@ -119,7 +242,7 @@ def main():
                 col1, col2 = st.columns([4, 1])
                 with col1:
                     if st.button(
-                        chat['name'],
+                        f"🗄️ {chat['name']}" if chat.get('archived') else chat['name'],
                         key=f"select_{chat_id}",
                         use_container_width=True
                     ):
@@ -129,15 +252,22 @@ def main():
                     if st.button("✏️", key=f"rename_btn_{chat_id}"):
                         st.session_state.renaming_chat = chat_id
                         st.rerun()
+        
+        # Older chats are fetched a page at a time
+        if st.session_state.chat_cursor is not None:
+            if st.button("Load more chats"):
+                load_chat_page()
+                st.rerun()
 
     # Main chat area
     current_chat = st.session_state.chats.get(st.session_state.current_chat_id)
+    current_messages = get_chat_messages(st.session_state.current_chat_id)
     
     if current_chat:
         st.subheader(current_chat['name'])
         
         # Display messages for current chat
-        for message in current_chat['messages']:
+        for message in current_messages:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
 
@@ -154,35 +284,36 @@ def main():
     if voice_clicked:
         prompt = get_voice_input()
         if prompt:
+            request = weather_agent.parse_request(
+                prompt, chat_id=st.session_state.current_chat_id, history=current_messages
+            )
             # If this is the first message in a new chat, generate name
-            if not current_chat['messages']:
-                chat_name = generate_chat_name(prompt)
+            if not current_messages:
+                chat_name = generate_chat_name(request)
                 st.session_state.chats[st.session_state.current_chat_id]['name'] = chat_name
                 db.update_chat_name(st.session_state.current_chat_id, chat_name)
             
             # Add user message to current chat
-            st.session_state.chats[st.session_state.current_chat_id]['messages'].append(
+            current_messages.append(
                 {"role": "user", "content": prompt}
             )
             
             # Get assistant response
-            with st.spinner("Checking weather..."):
-                response = weather_agent.run(prompt)
-                print(f"Assistant response: {response}")
-                speak_text(response)
-                print("Speaking response...")
-                
+            response = stream_response(prompt, request)
+            print(f"Assistant response: {response}")
+            speak_text(response)
+            print("Speaking response...")
             
             # Add assistant response to chat
-            st.session_state.chats[st.session_state.current_chat_id]['messages'].append(
+            current_messages.append(
                 {"role": "assistant", "content": response}
             )
             
-            # Save entire chat to database
-            db.save_chat(
+            # Persist only this turn's two messages
+            db.append_messages(
                 chat_id=st.session_state.current_chat_id,
                 chat_name=st.session_state.chats[st.session_state.current_chat_id]['name'],
-                messages=st.session_state.chats[st.session_state.current_chat_id]['messages']
+                messages=current_messages[-2:]
             )
             
             # Rerun to update display
@@ -190,31 +321,33 @@ def main():
 
     # Handle text input
     if prompt:
+        request = weather_agent.parse_request(
+            prompt, chat_id=st.session_state.current_chat_id, history=current_messages
+        )
         # If this is the first message in a new chat, generate name
-        if not current_chat['messages']:
-            chat_name = generate_chat_name(prompt)
+        if not current_messages:
+            chat_name = generate_chat_name(request)
             st.session_state.chats[st.session_state.current_chat_id]['name'] = chat_name
             db.update_chat_name(st.session_state.current_chat_id, chat_name)
         
         # Add user message to current chat
-        st.session_state.chats[st.session_state.current_chat_id]['messages'].append(
+        current_messages.append(
             {"role": "user", "content": prompt}
         )
         
         # Get assistant response
-        with st.spinner("Checking weather..."):
-            response = weather_agent.run(prompt)
+        response = stream_response(prompt, request)
         
         # Add assistant response to chat
-        st.session_state.chats[st.session_state.current_chat_id]['messages'].append(
+        current_messages.append(
             {"role": "assistant", "content": response}
         )
         
-        # Save entire chat to database
-        db.save_chat(
+        # Persist only this turn's two messages
+        db.append_messages(
             chat_id=st.session_state.current_chat_id,
             chat_name=st.session_state.chats[st.session_state.current_chat_id]['name'],
-            messages=st.session_state.chats[st.session_state.current_chat_id]['messages']
+            messages=current_messages[-2:]
         )
         
         # Rerun to update display
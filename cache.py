@@ -0,0 +1,276 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+from database import connect
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a location string so equivalent spellings share a cache key"""
+    return " ".join(location.lower().split()) if location else ""
+
+
+class SqliteCacheBackend:
+    """
+    On-disk cache tier that several worker processes can share.
+
+    Expired rows are swept every `purge_every` writes so the file stays bounded.
+    """
+
+    def __init__(self, db_path: str, purge_every: int = 500):
+        self.conn = connect(db_path)
+        self._lock = threading.Lock()
+        self.purge_every = purge_every
+        self._writes = 0
+        with self._lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            self.conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (value, expires_at) for a live entry, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT value, expires_at FROM response_cache WHERE cache_key = ?', (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO response_cache (cache_key, value, expires_at)
+                VALUES (?, ?, ?)
+            ''', (key, json.dumps(value), expires_at))
+            self._writes += 1
+            if self.purge_every and self._writes % self.purge_every == 0:
+                self._delete_expired()
+            self.conn.commit()
+
+    def purge_expired(self):
+        """Drop expired rows so the shared file does not grow without bound"""
+        with self._lock:
+            self._delete_expired()
+            self.conn.commit()
+
+    def _delete_expired(self):
+        self.conn.execute('DELETE FROM response_cache WHERE expires_at <= ?', (time.time(),))
+
+    def close(self):
+        self.conn.close()
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache with per-entry TTL and hit/miss counters"""
+
+    def __init__(self, maxsize: int = 256, backend: Optional[SqliteCacheBackend] = None):
+        self.maxsize = maxsize
+        self.backend = backend
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a cached value, consulting the shared backend on a local miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        if self.backend is not None:
+            stored = self.backend.get(key)
+            if stored is not None:
+                value, expires_at = stored
+                self._store(key, value, expires_at)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Cache a value for ttl seconds, evicting the least recently used entry if full"""
+        expires_at = time.time() + ttl
+        self._store(key, value, expires_at)
+        if self.backend is not None:
+            self.backend.set(key, value, expires_at)
+
+    def remaining_ttl(self, key: str) -> float:
+        """Get the seconds a locally cached entry has left to live, or 0 if it is missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+        return max(entry[1] - time.time(), 0.0) if entry is not None else 0.0
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize
+            }
+
+
+class RateLimiter:
+    """Spaces calls at least min_interval seconds apart across all threads of the process"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next free slot and return how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            return slot - now
+
+    def wait(self):
+        """Block until the caller may issue its request"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class GeocodeCache:
+    """Persistent city -> (lat, lon) store with an in-memory LRU hot tier"""
+
+    def __init__(self, db_path: str, hot_size: int = 1024):
+        self.conn = connect(db_path)
+        self._lock = threading.Lock()
+        self._hot = TTLCache(maxsize=hot_size)
+        with self._lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS geocodes (
+                    city TEXT PRIMARY KEY,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.conn.commit()
+
+    def get(self, city: str) -> Optional[Tuple[float, float]]:
+        """Look up coordinates, promoting on-disk hits into the hot tier"""
+        key = normalize_location(city)
+        coordinates = self._hot.get(key)
+        if coordinates is not None:
+            return coordinates
+
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT latitude, longitude FROM geocodes WHERE city = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        coordinates = (row[0], row[1])
+        self._hot.set(key, coordinates, float("inf"))
+        return coordinates
+
+    def set(self, city: str, coordinates: Tuple[float, float]):
+        key = normalize_location(city)
+        self._hot.set(key, coordinates, float("inf"))
+        with self._lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO geocodes (city, latitude, longitude)
+                VALUES (?, ?, ?)
+            ''', (key, coordinates[0], coordinates[1]))
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        """Get hit/miss counters of the hot tier"""
+        return self._hot.stats()
+
+    def close(self):
+        self.conn.close()
+
+
+class HistoricalWeatherStore:
+    """Write-once on-disk store of daily historical weather keyed by (city, ISO date)"""
+
+    def __init__(self, db_path: str):
+        self.conn = connect(db_path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS historical_weather (
+                    city TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (city, date)
+                )
+            ''')
+            self.conn.commit()
+
+    def get(self, city: str, date_str: str) -> Optional[dict]:
+        """Get the stored daily payload for a city and date, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT payload FROM historical_weather WHERE city = ? AND date = ?',
+                (normalize_location(city), date_str)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def has(self, city: str, date_str: str) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM historical_weather WHERE city = ? AND date = ?',
+                (normalize_location(city), date_str)
+            ).fetchone()
+        return row is not None
+
+    def put(self, city: str, date_str: str, payload: dict):
+        """Store a payload; existing entries are never overwritten since past weather is immutable"""
+        self.bulk_load([(city, date_str, payload)])
+
+    def bulk_load(self, records: Iterable[Tuple[str, str, dict]]):
+        """Pre-fill the store with (city, date, payload) records in a single transaction"""
+        rows = [
+            (normalize_location(city), date_str, json.dumps(payload))
+            for city, date_str, payload in records
+        ]
+        with self._lock:
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO historical_weather (city, date, payload)
+                VALUES (?, ?, ?)
+            ''', rows)
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -18,10 +18,83 @@ class Config:
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
     ANOTHERAPI_KEY=os.getenv("ANOTHERAPI_KEY")
     
+    # Storage Configuration
+    DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weather_history.db')
+    DB_BUSY_TIMEOUT = 5.0  # seconds a writer waits for a lock before raising "database is locked"
+    DB_CACHE_SIZE_KB = 8192  # Page cache per connection
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))  # Connections shared by all sessions of the process
+    CHAT_PAGE_SIZE = 20  # Chat summaries loaded per sidebar page
+    CHAT_BODY_CACHE_SIZE = 10  # Opened chats whose messages stay in a session's memory
+    SEARCH_PAGE_SIZE = 10  # Chat search results per page
+    ARCHIVE_IDLE_DAYS = float(os.getenv("ARCHIVE_IDLE_DAYS", "30"))  # Chats untouched this long move to the compressed archive
+    ARCHIVE_COMPRESSION_LEVEL = 9  # zlib level; archiving is a background job, so favour ratio over speed
+    GAZETTEER_PATH = os.getenv(
+        "GAZETTEER_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cities.txt')
+    )
+    
+    # Startup Configuration
+    STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.5"))  # Target time for a session's first run
+    
     # Weather API Configuration
     WEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
     FORECAST_CNT = 8  # Get next 24 hours (3-hour intervals)
+    FORECAST_FULL_CNT = 40  # Full 5 days of 3-hour intervals
+    UNIFIED_FORECAST = True  # Derive today/+N hours/tomorrow/later views from one cached full forecast
+    FORECAST_NOW_TOLERANCE = 5400  # seconds; a forecast slot this close to now can stand in for current weather
     
     # LLM Configuration
     LLM_MODEL = "gemini-1.5-flash"
-    LLM_TEMPERATURE = 0.7
\ No newline at end of file
+    LLM_TEMPERATURE = 0.7
+    EXTRACTION_LLM_MODEL = os.getenv("EXTRACTION_LLM_MODEL", LLM_MODEL)
+    EXTRACTION_LLM_TEMPERATURE = 0.0  # Deterministic output for single-token extraction
+    EXTRACTION_LLM_MAX_TOKENS = 16
+    LLM_WARMUP_PING = os.getenv("LLM_WARMUP_PING", "false").lower() == "true"
+    
+    # HTTP Transport Configuration
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "16"))  # Open connections to one provider
+    HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "4"))  # Idle connections kept warm per provider
+    HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection when a host's pool is full
+    HTTP_MAX_RETRIES = 1  # Connection-level retries only; requests that reached the server are not resent
+    HTTP_USER_AGENT = "weather-app"
+    BATCH_MAX_CONCURRENCY = 8  # Upper bound on simultaneous upstream calls per multi-city lookup
+    
+    # Response Cache Configuration
+    CURRENT_WEATHER_TTL = 600  # seconds; OpenWeather refreshes current conditions about every 10 minutes
+    FORECAST_TTL = 1800  # seconds; 3-hourly forecast slots change rarely within half an hour
+    RESPONSE_CACHE_MAXSIZE = 512
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")  # Shared on-disk tier for multi-process deployments
+    RESPONSE_CACHE_PURGE_EVERY = 500  # Writes between sweeps of expired rows from the on-disk tier
+    
+    # Geocoding Configuration
+    GEOCODE_HOT_CACHE_SIZE = 1024
+    NOMINATIM_MIN_INTERVAL = 1.0  # seconds; Nominatim usage policy allows at most 1 request/second
+    
+    # NLP Configuration
+    NLTK_DATA_PATH = os.getenv(
+        "NLTK_DATA_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'nltk_data')
+    )  # Bundled corpora; fill with `python nlp.py`
+    NLP_CACHE_SIZE = 256  # Prompt analyses kept in memory
+    
+    # Date Parsing Configuration
+    DATE_DAY_FIRST = os.getenv("DATE_DAY_FIRST", "true").lower() == "true"  # Read 05/03/2025 as 5 March
+    DATE_TONIGHT_HOUR = 21  # Local hour "tonight" refers to
+    DATE_RANGE_MAX_DAYS = 7  # Longest date range answered day by day
+    
+    # Intent Router Configuration
+    ROUTER_ENABLED = True
+    ROUTER_MAX_WORDS = 12  # Longer prompts are treated as open-ended and go to the agent
+    ROUTER_TRUSTED_SOURCES = ("gazetteer",)  # Location sources confident enough to skip the agent
+    
+    # Answer Cache Configuration
+    ANSWER_CACHE_MAXSIZE = 1024
+    ANSWER_CACHE_HISTORICAL_TTL = 86400  # seconds; answers about past dates never change
+    
+    # Conversation Memory Configuration
+    MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))  # Estimated tokens of history + context per prompt
+    MEMORY_KEEP_TURNS = 3  # Most recent user/assistant turns passed to the agent verbatim
+    MEMORY_SUMMARY_MAX_WORDS = 120  # Target length of the rolling summary of older turns
+    MEMORY_SUMMARY_MAX_TOKENS = 256
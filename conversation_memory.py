@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import Config
+from llm_registry import LLMRegistry
+
+
+class ConversationMemory:
+    """
+    Token-bounded memory of a chat for the agent prompt.
+
+    The last few turns are kept verbatim; older turns are folded into a rolling
+    summary that is persisted with the chat, so the prompt stays roughly the same
+    size however long the conversation grows.
+    """
+
+    def __init__(self, db, token_budget: Optional[int] = None, keep_turns: Optional[int] = None):
+        self.db = db
+        self.token_budget = token_budget or Config.MEMORY_TOKEN_BUDGET
+        self.keep_turns = keep_turns or Config.MEMORY_KEEP_TURNS
+        # One worker: summaries of the same chat are updated in order, off the request path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-memory")
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap token estimate (about 4 characters per token for English text)"""
+        return len(text) // 4 + 1
+
+    @staticmethod
+    def _format_messages(messages: List[Dict]) -> str:
+        return "\n".join(
+            f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}"
+            for message in messages
+        )
+
+    def build_prompt(self, prompt: str, chat_id: Optional[str] = None,
+                     history: Optional[List[Dict]] = None, context: str = "") -> str:
+        """
+        Assemble the agent prompt within the token budget.
+
+        The user's prompt is always kept; the remaining budget goes, in order, to the
+        most recent unsummarized turns (newest first), the summary of older turns,
+        and the related-query context.
+        """
+        remaining = self.token_budget - self.estimate_tokens(prompt)
+        summary, summarized_seq = "", 0
+        if chat_id and history:
+            summary, summarized_seq = self.db.get_chat_summary(chat_id)
+
+        recent = []
+        for message in reversed((history or [])[summarized_seq:]):
+            cost = self.estimate_tokens(message['content'])
+            if cost > remaining:
+                break
+            recent.insert(0, message)
+            remaining -= cost
+
+        sections = []
+        if summary and self.estimate_tokens(summary) <= remaining:
+            sections.append(f"Summary of the earlier conversation:\n{summary}")
+            remaining -= self.estimate_tokens(summary)
+        if recent:
+            sections.append(f"Recent conversation:\n{self._format_messages(recent)}")
+        if context and self.estimate_tokens(context) <= remaining:
+            sections.append(context.strip())
+
+        if not sections:
+            return prompt
+        sections.append(f"User: {prompt}")
+        return "\n\n".join(sections)
+
+    def update(self, chat_id: Optional[str], messages: List[Dict]):
+        """Fold turns that fell out of the verbatim window into the summary, in the background"""
+        if chat_id and len(messages) > self.keep_turns * 2:
+            self._executor.submit(self._summarize, chat_id, list(messages))
+
+    def _summarize(self, chat_id: str, messages: List[Dict]):
+        """Extend the stored summary with the messages between it and the verbatim window"""
+        try:
+            summary, summarized_seq = self.db.get_chat_summary(chat_id)
+            cutoff = len(messages) - self.keep_turns * 2
+            if cutoff <= summarized_seq:
+                return
+
+            model = LLMRegistry.get_summary_llm()
+            response = model.invoke(
+                "Update the running summary of a conversation with a weather assistant.\n"
+                f"Keep it under {Config.MEMORY_SUMMARY_MAX_WORDS} words and keep every location, "
+                "date and user preference mentioned.\n\n"
+                f"Current summary:\n{summary or '(empty)'}\n\n"
+                f"New messages:\n{self._format_messages(messages[summarized_seq:cutoff])}\n\n"
+                "Updated summary:"
+            )
+            self.db.save_chat_summary(chat_id, response.content.strip(), cutoff)
+        except Exception as e:
+            # The turns stay unsummarized and are retried after the next message
+            print(f"Error updating chat summary: {e}")
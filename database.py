@@ -1,132 +1,698 @@
+import json
+import queue
+import re
 import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-import os
 import uuid
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
+from config import Config
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection tuned for many concurrent readers and one writer.
+    
+    WAL lets readers proceed while a write is in progress, and busy_timeout makes
+    competing writers wait for the lock instead of failing immediately. Connections
+    may be handed between threads (pooled or lock-guarded), never used by two at once.
+    """
+    conn = sqlite3.connect(db_path, timeout=Config.DB_BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')  # Durable across app crashes under WAL; fsync only at checkpoints
+    conn.execute(f'PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT * 1000)}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute(f'PRAGMA cache_size=-{Config.DB_CACHE_SIZE_KB}')
+    return conn
 
 class WeatherHistoryDB:
-    def __init__(self):
-        db_path = os.path.join(os.path.dirname(__file__), 'weather_history.db')
-        self.conn = sqlite3.connect(db_path)
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or Config.DB_PATH
+        # Idle connections, reused across threads and Streamlit reruns; at most DB_POOL_SIZE exist
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(Config.DB_POOL_SIZE)
+        self.search_enabled = False
         self._create_tables()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for one operation, opening it on first use"""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.db_path)
+            try:
+                yield conn
+            finally:
+                # Never hand an open transaction to the next borrower
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
         
     def _create_tables(self):
-        cursor = self.conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        # Create chats table to store chat metadata
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chats (
-                chat_id TEXT PRIMARY KEY,
-                chat_name TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            # Create chats table to store chat metadata
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chats (
+                    chat_id TEXT PRIMARY KEY,
+                    chat_name TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    summary TEXT,
+                    summarized_seq INTEGER NOT NULL DEFAULT 0,
+                    archived INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+        
+            # Create messages table to store conversation history
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL DEFAULT 0,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
+                    content TEXT NOT NULL,
+                    FOREIGN KEY (chat_id) REFERENCES chats (chat_id)
+                )
+            ''')
+        
+            # Cold tier: one compressed blob per idle chat, moved back into messages when opened
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archived_chats (
+                    chat_id TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    message_count INTEGER NOT NULL,
+                    raw_bytes INTEGER NOT NULL,
+                    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    search_id INTEGER,
+                    FOREIGN KEY (chat_id) REFERENCES chats (chat_id)
+                )
+            ''')
+        
+            # Create queries table to log answered requests for context retrieval
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS queries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    input TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    location TEXT,
+                    date TEXT,
+                    sentiment REAL
+                )
+            ''')
+        
+            self._migrate_message_seq(cursor)
+            self._migrate_chat_columns(cursor)
+            self._migrate_archive_columns(cursor)
+
+            # Per-chat message reads and the newest-first chat listing are index range scans
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_chat_seq ON messages (chat_id, seq)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chats_created_at ON chats (created_at, chat_id)')
+            # Newest-first walk within a location, filtering sentiment from the index itself,
+            # so top-k retrieval stops after k matches however large the log grows
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_queries_location_time ON queries (location, timestamp, sentiment)'
             )
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_archived_chats_search_id ON archived_chats (search_id)')
+
+            self._create_search_index(cursor)
+            conn.commit()
+
+    def _create_search_index(self, cursor):
+        """
+        Create FTS5 indexes over message contents and chat names, kept in sync by triggers.
+
+        Archived chats are indexed separately in archived_fts, one row per chat. It is
+        contentless, so it stores no copy of the compressed text; rows are keyed by
+        archived_chats.search_id because VACUUM may renumber implicit rowids.
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+        is_new = cursor.fetchone() is None
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'archived_fts'")
+        archive_is_new = cursor.fetchone() is None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+                USING fts5(content, content='messages', content_rowid='id')
+            ''')
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts
+                USING fts5(chat_name, content='chats', content_rowid='rowid')
+            ''')
+            cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS archived_fts USING fts5(content, content='')")
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable: {e}")
+            self.search_enabled = False
+            return
+        self.search_enabled = True
+        
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chats_fts_insert AFTER INSERT ON chats BEGIN
+                INSERT INTO chats_fts (rowid, chat_name) VALUES (new.rowid, new.chat_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chats_fts_delete AFTER DELETE ON chats BEGIN
+                INSERT INTO chats_fts (chats_fts, rowid, chat_name) VALUES ('delete', old.rowid, old.chat_name);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chats_fts_update AFTER UPDATE OF chat_name ON chats BEGIN
+                INSERT INTO chats_fts (chats_fts, rowid, chat_name) VALUES ('delete', old.rowid, old.chat_name);
+                INSERT INTO chats_fts (rowid, chat_name) VALUES (new.rowid, new.chat_name);
+            END;
         ''')
         
-        # Create messages table to store conversation history
+        # Index history written before search existed
+        if is_new:
+            cursor.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO chats_fts (chats_fts) VALUES ('rebuild')")
+        # Index chats archived before archived_fts existed
+        if archive_is_new:
+            cursor.execute('SELECT chat_id FROM archived_chats')
+            for (chat_id,) in cursor.fetchall():
+                self._index_archive(cursor, chat_id, self._load_archive(cursor, chat_id))
+
+    def _migrate_message_seq(self, cursor):
+        """Add the per-chat seq column to databases created before it existed"""
+        cursor.execute('PRAGMA table_info(messages)')
+        if any(row[1] == 'seq' for row in cursor.fetchall()):
+            return
+        cursor.execute('ALTER TABLE messages ADD COLUMN seq INTEGER NOT NULL DEFAULT 0')
+        # Number existing messages 0..n-1 within each chat in insertion order
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
-                content TEXT NOT NULL,
-                FOREIGN KEY (chat_id) REFERENCES chats (chat_id)
+            UPDATE messages
+            SET seq = (
+                SELECT COUNT(*) FROM messages AS earlier
+                WHERE earlier.chat_id = messages.chat_id AND earlier.id < messages.id
             )
         ''')
-        
-        self.conn.commit()
+
+    def _migrate_chat_columns(self, cursor):
+        """Add the summary and archive columns to databases created before they existed"""
+        cursor.execute('PRAGMA table_info(chats)')
+        columns = {row[1] for row in cursor.fetchall()}
+        for name, definition in (
+            ('summary', 'TEXT'),
+            ('summarized_seq', 'INTEGER NOT NULL DEFAULT 0'),
+            ('archived', 'INTEGER NOT NULL DEFAULT 0'),
+        ):
+            if name not in columns:
+                cursor.execute(f'ALTER TABLE chats ADD COLUMN {name} {definition}')
+
+    def _migrate_archive_columns(self, cursor):
+        """Add the search_id column to archives created before archived chats were searchable"""
+        cursor.execute('PRAGMA table_info(archived_chats)')
+        if not any(row[1] == 'search_id' for row in cursor.fetchall()):
+            cursor.execute('ALTER TABLE archived_chats ADD COLUMN search_id INTEGER')
 
     def save_chat(self, chat_id: str, chat_name: str, messages: List[Dict]):
-        """Save or update a chat with its messages"""
-        cursor = self.conn.cursor()
+        """Save or update a chat, replacing all of its messages (use append_messages for new turns)"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        # Insert or update chat metadata
-        cursor.execute('''
-            INSERT OR REPLACE INTO chats (chat_id, chat_name, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (chat_id, chat_name))
-        
-        # Clear existing messages for this chat
-        cursor.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
+            # Insert or update chat metadata
+            self._upsert_chat(cursor, chat_id, chat_name)
         
-        # Insert all messages
-        for message in messages:
+            # Clear existing messages for this chat (including an archived copy), and the summary built from them
+            cursor.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
+            cursor.execute('DELETE FROM archived_chats WHERE chat_id = ?', (chat_id,))
             cursor.execute('''
-                INSERT INTO messages (chat_id, role, content)
-                VALUES (?, ?, ?)
-            ''', (chat_id, message['role'], message['content']))
+                UPDATE chats SET summary = NULL, summarized_seq = 0, archived = 0 WHERE chat_id = ?
+            ''', (chat_id,))
+        
+            # Insert all messages
+            cursor.executemany('''
+                INSERT INTO messages (chat_id, seq, role, content)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (chat_id, seq, message['role'], message['content'])
+                for seq, message in enumerate(messages)
+            ])
         
-        self.conn.commit()
+            conn.commit()
+
+    def append_messages(self, chat_id: str, chat_name: str, messages: List[Dict]):
+        """Append new messages to a chat in one transaction, creating the chat if needed"""
+        with self._connection() as conn:
+            with conn:
+                cursor = conn.cursor()
+                self._restore_chat(cursor, chat_id)
+                self._upsert_chat(cursor, chat_id, chat_name)
+            
+                cursor.execute(
+                    'SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE chat_id = ?', (chat_id,)
+                )
+                next_seq = cursor.fetchone()[0]
+            
+                cursor.executemany('''
+                    INSERT INTO messages (chat_id, seq, role, content)
+                    VALUES (?, ?, ?, ?)
+                ''', [
+                    (chat_id, next_seq + offset, message['role'], message['content'])
+                    for offset, message in enumerate(messages)
+                ])
+
+    def _upsert_chat(self, cursor, chat_id: str, chat_name: str):
+        """Create a chat or refresh its name, keeping the original created_at"""
+        cursor.execute('''
+            INSERT INTO chats (chat_id, chat_name, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                chat_name = excluded.chat_name,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (chat_id, chat_name))
     def get_all_chats(self) -> List[Dict]:
         """Get all chats with their messages"""
-        cursor = self.conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        # Get all chats
-        cursor.execute('SELECT chat_id, chat_name, created_at FROM chats ORDER BY created_at DESC')
-        chats = cursor.fetchall()
+            # Get all chats
+            cursor.execute('SELECT chat_id, chat_name, created_at, archived FROM chats ORDER BY created_at DESC')
+            chats = cursor.fetchall()
         
-        full_chats = []
-        for chat in chats:
-            chat_id, chat_name, created_at = chat
+            full_chats = []
+            for chat in chats:
+                chat_id, chat_name, created_at, archived = chat
+            
+                # Get messages for this chat; archived ones are read from the cold tier in place
+                if archived:
+                    messages = [
+                        {"role": message['role'], "content": message['content']}
+                        for message in self._load_archive(cursor, chat_id)
+                    ]
+                else:
+                    cursor.execute('''
+                        SELECT role, content
+                        FROM messages
+                        WHERE chat_id = ?
+                        ORDER BY seq ASC, id ASC
+                    ''', (chat_id,))
+                    messages = [
+                        {"role": row[0], "content": row[1]}
+                        for row in cursor.fetchall()
+                    ]
             
-            # Get messages for this chat
+                full_chats.append({
+                    'chat_id': chat_id,
+                    'chat_name': chat_name,
+                    'created_at': created_at,
+                    'messages': messages
+                })
+        
+            return full_chats
+
+    def list_chats(self, limit: Optional[int] = None,
+                   cursor: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """
+        Get one page of chat summaries, newest first, without their messages.
+        
+        Args:
+            limit: Page size (defaults to Config.CHAT_PAGE_SIZE)
+            cursor: The cursor returned with the previous page, or None for the first page
+            
+        Returns:
+            (summaries, next_cursor) where next_cursor is None on the last page; each summary's
+            'archived' flag marks chats whose messages are in the cold tier
+        """
+        with self._connection() as conn:
+            limit = limit or Config.CHAT_PAGE_SIZE
+            cursor_obj = conn.cursor()
+            if cursor is None:
+                cursor_obj.execute('''
+                    SELECT chat_id, chat_name, created_at, archived
+                    FROM chats
+                    ORDER BY created_at DESC, chat_id DESC
+                    LIMIT ?
+                ''', (limit,))
+            else:
+                # (created_at, chat_id) is unique, so the page boundary is stable under concurrent inserts
+                cursor_obj.execute('''
+                    SELECT chat_id, chat_name, created_at, archived
+                    FROM chats
+                    WHERE (created_at, chat_id) < (?, ?)
+                    ORDER BY created_at DESC, chat_id DESC
+                    LIMIT ?
+                ''', (cursor[0], cursor[1], limit))
+        
+            summaries = [
+                {'chat_id': row[0], 'chat_name': row[1], 'created_at': row[2], 'archived': bool(row[3])}
+                for row in cursor_obj.fetchall()
+            ]
+            next_cursor = None
+            if len(summaries) == limit:
+                next_cursor = (summaries[-1]['created_at'], summaries[-1]['chat_id'])
+            return summaries, next_cursor
+
+    def search_chats(self, query: str, limit: int = 10, offset: int = 0) -> List[Dict]:
+        """
+        Full-text search over chat names and message contents, best matches first.
+        
+        Each word of the query must appear (prefix match). A chat appears once, with the
+        snippet of its best-matching message or name; name matches rank higher.
+        Archived chats are searched too; their snippets are cut from the decompressed archive.
+
+        Returns:
+            List of {'chat_id', 'chat_name', 'created_at', 'snippet'}
+        """
+        with self._connection() as conn:
+            terms = re.findall(r"\w+", query)
+            if not terms or not self.search_enabled:
+                return []
+            match = " ".join(f'"{term}"*' for term in terms)
+        
+            cursor = conn.cursor()
             cursor.execute('''
-                SELECT role, content 
-                FROM messages 
-                WHERE chat_id = ? 
-                ORDER BY timestamp ASC
-            ''', (chat_id,))
-            messages = [
-                {"role": row[0], "content": row[1]}
+                WITH hits AS (
+                    SELECT m.chat_id AS chat_id,
+                           bm25(messages_fts) AS score,
+                           snippet(messages_fts, 0, '**', '**', '...', 12) AS snippet
+                    FROM messages_fts
+                    JOIN messages m ON m.id = messages_fts.rowid
+                    WHERE messages_fts MATCH ?
+                    UNION ALL
+                    SELECT c.chat_id,
+                           bm25(chats_fts) * 2,
+                           snippet(chats_fts, 0, '**', '**', '...', 12)
+                    FROM chats_fts
+                    JOIN chats c ON c.rowid = chats_fts.rowid
+                    WHERE chats_fts MATCH ?
+                    UNION ALL
+                    SELECT a.chat_id, bm25(archived_fts), NULL
+                    FROM archived_fts
+                    JOIN archived_chats a ON a.search_id = archived_fts.rowid
+                    WHERE archived_fts MATCH ?
+                )
+                SELECT c.chat_id, c.chat_name, c.created_at, h.snippet, MIN(h.score) AS score
+                FROM hits h
+                JOIN chats c ON c.chat_id = h.chat_id
+                GROUP BY c.chat_id
+                ORDER BY score ASC, c.created_at DESC
+                LIMIT ? OFFSET ?
+            ''', (match, match, match, limit, offset))
+        
+            return [
+                {
+                    'chat_id': row[0],
+                    'chat_name': row[1],
+                    'created_at': row[2],
+                    'snippet': row[3] if row[3] is not None else self._archive_snippet(cursor, row[0], terms)
+                }
                 for row in cursor.fetchall()
             ]
-            
-            full_chats.append({
-                'chat_id': chat_id,
-                'chat_name': chat_name,
-                'created_at': created_at,
-                'messages': messages
-            })
-        
-        return full_chats
+
+    def _archive_snippet(self, cursor, chat_id: str, terms: List[str], size: int = 12) -> str:
+        """Cut a snippet like FTS5's snippet() from the first archived message matching a query term"""
+        prefixes = tuple(term.lower() for term in terms)
+        for message in self._load_archive(cursor, chat_id):
+            words = message['content'].split()
+            hits = [
+                i for i, word in enumerate(words)
+                if any(token.startswith(prefixes) for token in re.findall(r"\w+", word.lower()))
+            ]
+            if not hits:
+                continue
+            start = max(0, min(hits[0] - size // 2, len(words) - size))
+            window = [
+                f"**{word}**" if i in hits else word
+                for i, word in enumerate(words[start:start + size], start)
+            ]
+            return ("..." if start > 0 else "") + " ".join(window) + ("..." if start + size < len(words) else "")
+        return ""
 
     def get_chat_messages(self, chat_id: str) -> List[Dict]:
-        """Get all messages for a specific chat"""
-        cursor = self.conn.cursor()
+        """Get all messages for a specific chat, restoring it from the archive if needed"""
+        with self._connection() as conn:
+            with conn:
+                self._restore_chat(conn.cursor(), chat_id)
+
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT role, content, timestamp
+                FROM messages
+                WHERE chat_id = ?
+                ORDER BY seq ASC, id ASC
+            ''', (chat_id,))
+        
+            messages = []
+            for row in cursor.fetchall():
+                messages.append({
+                    'role': row[0],
+                    'content': row[1],
+                    'timestamp': row[2]
+                })
+            return messages
+
+    def archive_idle_chats(self, idle_days: Optional[float] = None, batch_size: int = 100) -> int:
+        """
+        Move the messages of chats idle for idle_days into the compressed archive.
+
+        The chat row stays (so it is still listed and its name still searchable) with
+        archived = 1; its messages are restored transparently when it is opened.
+        Chats are archived batch_size at a time, one transaction per batch.
+
+        Returns:
+            Number of chats archived
+        """
+        with self._connection() as conn:
+            idle_days = Config.ARCHIVE_IDLE_DAYS if idle_days is None else idle_days
+            archived_count = 0
+            while True:
+                with conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT chat_id FROM chats
+                        WHERE archived = 0 AND updated_at < datetime('now', ?)
+                        LIMIT ?
+                    ''', (f'-{idle_days} days', batch_size))
+                    chat_ids = [row[0] for row in cursor.fetchall()]
+                    for chat_id in chat_ids:
+                        self._archive_chat(cursor, chat_id)
+                archived_count += len(chat_ids)
+                if len(chat_ids) < batch_size:
+                    return archived_count
+
+    def _archive_chat(self, cursor, chat_id: str):
+        """Compress a chat's messages into one archive row and drop them from the hot table"""
         cursor.execute('''
-            SELECT role, content, timestamp
+            SELECT seq, timestamp, role, content
             FROM messages
             WHERE chat_id = ?
-            ORDER BY timestamp ASC
+            ORDER BY seq ASC, id ASC
+        ''', (chat_id,))
+        messages = [
+            {'seq': row[0], 'timestamp': row[1], 'role': row[2], 'content': row[3]}
+            for row in cursor.fetchall()
+        ]
+        raw = json.dumps(messages, separators=(',', ':')).encode('utf-8')
+        cursor.execute('''
+            INSERT OR REPLACE INTO archived_chats (chat_id, payload, message_count, raw_bytes)
+            VALUES (?, ?, ?, ?)
+        ''', (chat_id, zlib.compress(raw, Config.ARCHIVE_COMPRESSION_LEVEL), len(messages), len(raw)))
+        # Keep the text searchable once the delete trigger drops it from messages_fts
+        self._index_archive(cursor, chat_id, messages)
+        cursor.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
+        cursor.execute('UPDATE chats SET archived = 1 WHERE chat_id = ?', (chat_id,))
+
+    def _load_archive(self, cursor, chat_id: str) -> List[Dict]:
+        """Decompress an archived chat's messages, or [] if it is not archived"""
+        cursor.execute('SELECT payload FROM archived_chats WHERE chat_id = ?', (chat_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return []
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    @staticmethod
+    def _archive_text(messages: List[Dict]) -> str:
+        return "\n".join(message['content'] for message in messages)
+
+    def _index_archive(self, cursor, chat_id: str, messages: List[Dict]):
+        """Add an archived chat's text to archived_fts under a fresh search_id"""
+        if not self.search_enabled:
+            return
+        cursor.execute('SELECT COALESCE(MAX(search_id), 0) + 1 FROM archived_chats')
+        search_id = cursor.fetchone()[0]
+        cursor.execute('UPDATE archived_chats SET search_id = ? WHERE chat_id = ?', (search_id, chat_id))
+        cursor.execute(
+            'INSERT INTO archived_fts (rowid, content) VALUES (?, ?)', (search_id, self._archive_text(messages))
+        )
+
+    def _unindex_archive(self, cursor, chat_id: str, messages: List[Dict]):
+        """Remove an archived chat from archived_fts; a contentless index needs the original text to do so"""
+        if not self.search_enabled:
+            return
+        cursor.execute('SELECT search_id FROM archived_chats WHERE chat_id = ?', (chat_id,))
+        row = cursor.fetchone()
+        if row is not None and row[0] is not None:
+            cursor.execute(
+                "INSERT INTO archived_fts (archived_fts, rowid, content) VALUES ('delete', ?, ?)",
+                (row[0], self._archive_text(messages))
+            )
+
+    def _restore_chat(self, cursor, chat_id: str):
+        """Move an archived chat's messages back into the hot table, keeping their seq and timestamps"""
+        cursor.execute('SELECT archived FROM chats WHERE chat_id = ?', (chat_id,))
+        row = cursor.fetchone()
+        if row is None or not row[0]:
+            return
+        messages = self._load_archive(cursor, chat_id)
+        cursor.executemany('''
+            INSERT INTO messages (chat_id, seq, timestamp, role, content)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (chat_id, message['seq'], message['timestamp'], message['role'], message['content'])
+            for message in messages
+        ])
+        self._unindex_archive(cursor, chat_id, messages)
+        cursor.execute('DELETE FROM archived_chats WHERE chat_id = ?', (chat_id,))
+        # Reset the idle clock so the chat is not archived again right away
+        cursor.execute('''
+            UPDATE chats SET archived = 0, updated_at = CURRENT_TIMESTAMP WHERE chat_id = ?
         ''', (chat_id,))
+
+    def storage_stats(self) -> Dict:
+        """Get the size of the hot (live messages) and cold (compressed archive) tiers"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(DISTINCT chat_id), COUNT(*), COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0)
+                FROM messages
+            ''')
+            hot_chats, hot_messages, hot_bytes = cursor.fetchone()
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(SUM(message_count), 0),
+                       COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(LENGTH(payload)), 0)
+                FROM archived_chats
+            ''')
+            cold_chats, cold_messages, cold_raw_bytes, cold_bytes = cursor.fetchone()
+            return {
+                'hot_chats': hot_chats,
+                'hot_messages': hot_messages,
+                'hot_bytes': hot_bytes,
+                'cold_chats': cold_chats,
+                'cold_messages': cold_messages,
+                'cold_raw_bytes': cold_raw_bytes,
+                'cold_bytes': cold_bytes,
+                'compression_ratio': cold_raw_bytes / cold_bytes if cold_bytes else 0.0
+            }
+
+    def get_chat_summary(self, chat_id: str) -> Tuple[str, int]:
+        """
+        Get the rolling summary of a chat's older messages.
+
+        Returns:
+            (summary, summarized_seq) where messages with seq < summarized_seq are covered
+            by the summary; ("", 0) if nothing has been summarized yet
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT summary, summarized_seq FROM chats WHERE chat_id = ?', (chat_id,))
+            row = cursor.fetchone()
+            if row is None or row[0] is None:
+                return "", 0
+            return row[0], row[1]
+
+    def save_chat_summary(self, chat_id: str, summary: str, summarized_seq: int):
+        """Store a chat's rolling summary unless a newer one has already been saved"""
+        with self._connection() as conn:
+            conn.execute('''
+                UPDATE chats
+                SET summary = ?, summarized_seq = ?
+                WHERE chat_id = ? AND summarized_seq < ?
+            ''', (summary, summarized_seq, chat_id, summarized_seq))
+            conn.commit()
+
+    def save_query(self, input_str: str, response: str, location: Optional[str],
+                   date: Optional[str], sentiment: Optional[float]):
+        """Append an answered request to the query log"""
+        with self._connection() as conn:
+            conn.execute('''
+                INSERT INTO queries (input, response, location, date, sentiment)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (input_str, response, location, date, sentiment))
+            conn.commit()
+
+    def get_recent_queries(self, location: str, limit: int = 3,
+                           min_sentiment: float = -1.0, max_sentiment: float = 1.0) -> List[Tuple]:
+        """
+        Get the most recent logged queries for a location within a sentiment range.
         
-        messages = []
-        for row in cursor.fetchall():
-            messages.append({
-                'role': row[0],
-                'content': row[1],
-                'timestamp': row[2]
-            })
-        return messages
+        Returns:
+            Rows of (id, timestamp, input, response), newest first
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, timestamp, input, response
+                FROM queries INDEXED BY idx_queries_location_time
+                WHERE location = ? AND sentiment BETWEEN ? AND ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            ''', (location, min_sentiment, max_sentiment, limit))
+            return cursor.fetchall()
 
     def update_chat_name(self, chat_id: str, new_name: str):
         """Update the name of an existing chat"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            UPDATE chats
-            SET chat_name = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE chat_id = ?
-        ''', (new_name, chat_id))
-        self.conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE chats
+                SET chat_name = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE chat_id = ?
+            ''', (new_name, chat_id))
+            conn.commit()
 
     def delete_chat(self, chat_id: str):
         """Delete a chat and all its messages"""
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
-        cursor.execute('DELETE FROM chats WHERE chat_id = ?', (chat_id,))
-        self.conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM messages WHERE chat_id = ?', (chat_id,))
+            self._unindex_archive(cursor, chat_id, self._load_archive(cursor, chat_id))
+            cursor.execute('DELETE FROM archived_chats WHERE chat_id = ?', (chat_id,))
+            cursor.execute('DELETE FROM chats WHERE chat_id = ?', (chat_id,))
+            conn.commit()
 
     def close(self):
-        """Close the database connection"""
-        self.conn.close()
\ No newline at end of file
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+if __name__ == "__main__":
+    # Maintenance entry point, e.g. from cron: python database.py archive --idle-days 30
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chat history maintenance")
+    parser.add_argument("command", choices=["archive", "stats"])
+    parser.add_argument("--idle-days", type=float, default=Config.ARCHIVE_IDLE_DAYS)
+    parser.add_argument("--vacuum", action="store_true", help="Reclaim the space freed by archiving")
+    args = parser.parse_args()
+
+    db = WeatherHistoryDB()
+    if args.command == "archive":
+        print(f"Archived {db.archive_idle_chats(args.idle_days)} chats")
+        if args.vacuum:
+            with db._connection() as conn:
+                conn.execute('VACUUM')
+                # VACUUM may renumber the chats rowids the chat-name index points at
+                if db.search_enabled:
+                    conn.execute("INSERT INTO chats_fts (chats_fts) VALUES ('rebuild')")
+                    conn.commit()
+    for key, value in db.storage_stats().items():
+        print(f"{key}: {value}")
+    db.close()
@@ -0,0 +1,207 @@
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from config import Config
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12
+}
+_WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12
+}
+_RELATIVE_DAYS = {
+    "day before yesterday": -2, "yesterday": -1, "today": 0, "tonight": 0, "now": 0,
+    "right now": 0, "current": 0, "currently": 0, "tomorrow": 1, "tmrw": 1, "tmr": 1,
+    "day after tomorrow": 2
+}
+# Labels understood by WeatherAgent.fetch_weather for days near today
+RELATIVE_LABELS = {-1: "yesterday", 0: "today", 1: "tomorrow", 2: "day after tomorrow"}
+
+_MONTH = (
+    r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+    r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+)
+# Full weekday names only: short forms like "sun" and "sat" are ordinary words in weather prompts
+_WEEKDAY = r"monday|tuesday|tues|wednesday|thursday|thurs|friday|saturday|sunday"
+_COUNT = r"\d{1,3}|an?|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve"
+
+# Every supported expression in one alternation, so a prompt is scanned once.
+# Longer forms come first because the leftmost alternative that matches wins.
+_DATE_PATTERN = re.compile(rf"""
+    \b(?:
+        (?P<iso>(?P<iso_y>\d{{4}})[-/.](?P<iso_m>\d{{1,2}})[-/.](?P<iso_d>\d{{1,2}}))
+      | (?P<numeric>(?P<num_a>\d{{1,2}})[/.](?P<num_b>\d{{1,2}})[/.](?P<num_y>\d{{4}}))
+      | (?P<md>(?P<md_m>{_MONTH})\.?\s+(?P<md_d>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<md_y>\d{{4}}))?)
+      | (?P<dm>(?P<dm_d>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<dm_m>{_MONTH})\.?(?:,?\s+(?P<dm_y>\d{{4}}))?)
+      | (?P<relative>day\s+before\s+yesterday|day\s+after\s+tomorrow|yesterday|today|tonight|
+                     right\s+now|now|currently|current|tomorrow|tmrw|tmr)
+      | (?P<ahead>in\s+(?P<ahead_n>{_COUNT})\s+(?P<ahead_unit>hours?|hrs?|days?|weeks?))
+      | (?P<from_now>(?P<from_now_n>{_COUNT})\s+(?P<from_now_unit>hours?|hrs?|days?|weeks?)\s+from\s+now)
+      | (?P<ago>(?P<ago_n>{_COUNT})\s+(?P<ago_unit>days?|weeks?)\s+ago)
+      | (?P<next_days>(?:next|coming)\s+(?P<next_days_n>{_COUNT})\s+days)
+      | (?P<weekend>(?:(?P<weekend_mod>this|next|coming|last)\s+)?weekend)
+      | (?P<week>(?P<week_mod>this|next|last)\s+week)
+      | (?P<weekday>(?:(?P<weekday_mod>this|next|coming|last)\s+)?(?P<weekday_name>{_WEEKDAY}))
+    )\b
+""", re.IGNORECASE | re.VERBOSE)
+
+# Joins two expressions into a range: "March 3 to March 5", "friday - sunday"
+_RANGE_JOINER = re.compile(r"\s*(?:to|until|till|through|thru|-|–|and)\s*", re.IGNORECASE)
+
+
+@dataclass(slots=True, frozen=True)
+class DateSpan:
+    """
+    Normalized result of parsing a date/time expression: an inclusive range of days.
+
+    A single day has start == end. `hours_offset` is set for point-in-time requests
+    ("in 3 hours", "tonight") and counts hours from now.
+    """
+    start: date
+    end: date
+    hours_offset: int = 0
+
+    @classmethod
+    def on(cls, day: date, hours_offset: int = 0) -> "DateSpan":
+        return cls(day, day, hours_offset)
+
+    @classmethod
+    def today(cls) -> "DateSpan":
+        return cls.on(datetime.now().date())
+
+    @property
+    def is_range(self) -> bool:
+        return self.end > self.start
+
+    def days(self) -> Iterator[date]:
+        """Iterate over every day of the span"""
+        for offset in range((self.end - self.start).days + 1):
+            yield self.start + timedelta(days=offset)
+
+    def label(self, today: Optional[date] = None) -> str:
+        """
+        Get the date string the weather pipeline understands for the span's first day.
+
+        Days near today map to 'yesterday'/'today'/'tomorrow'/'day after tomorrow',
+        others to an ISO date. Point-in-time spans are 'today' plus hours_offset.
+        """
+        if self.hours_offset:
+            return "today"
+        today = today or datetime.now().date()
+        return RELATIVE_LABELS.get((self.start - today).days, self.start.isoformat())
+
+
+def _count(value: str) -> int:
+    value = value.lower()
+    return _NUMBER_WORDS[value] if value in _NUMBER_WORDS else int(value)
+
+
+def _month(value: str) -> int:
+    return _MONTHS[value[:3].lower()]
+
+
+def _weekend(today: date, modifier: Optional[str]) -> DateSpan:
+    """Saturday-Sunday span; 'next' skips a weekend in progress, 'last' is the most recent finished one"""
+    if modifier == "last":
+        saturday = today - timedelta(days=(today.weekday() - 5) % 7)
+        if today.weekday() >= 5:
+            saturday -= timedelta(days=7)
+        return DateSpan(saturday, saturday + timedelta(days=1))
+    if today.weekday() >= 5 and modifier != "next":
+        return DateSpan(today, today + timedelta(days=6 - today.weekday()))
+    saturday = today + timedelta(days=(5 - today.weekday()) % 7 or 7)
+    return DateSpan(saturday, saturday + timedelta(days=1))
+
+
+def _weekday(today: date, name: str, modifier: Optional[str]) -> DateSpan:
+    """Upcoming occurrence (today included); 'next' excludes today, 'last' looks back"""
+    target = _WEEKDAYS[name[:3].lower()]
+    if modifier == "last":
+        return DateSpan.on(today - timedelta(days=(today.weekday() - target) % 7 or 7))
+    ahead = (target - today.weekday()) % 7
+    if modifier == "next" and ahead == 0:
+        ahead = 7
+    return DateSpan.on(today + timedelta(days=ahead))
+
+
+def _resolve(match: "re.Match", now: datetime) -> DateSpan:
+    """Turn one match into a span; raises ValueError for impossible dates like Feb 30"""
+    today = now.date()
+    group = match.group
+
+    if group("iso"):
+        return DateSpan.on(date(int(group("iso_y")), int(group("iso_m")), int(group("iso_d"))))
+    if group("numeric"):
+        day, month = int(group("num_a")), int(group("num_b"))
+        if not Config.DATE_DAY_FIRST:
+            day, month = month, day
+        if month > 12 >= day:  # Unambiguous the other way round
+            day, month = month, day
+        return DateSpan.on(date(int(group("num_y")), month, day))
+    if group("md"):
+        return DateSpan.on(date(int(group("md_y") or today.year), _month(group("md_m")), int(group("md_d"))))
+    if group("dm"):
+        return DateSpan.on(date(int(group("dm_y") or today.year), _month(group("dm_m")), int(group("dm_d"))))
+    if group("relative"):
+        phrase = " ".join(group("relative").lower().split())
+        if phrase == "tonight" and now.hour < Config.DATE_TONIGHT_HOUR:
+            return DateSpan.on(today, Config.DATE_TONIGHT_HOUR - now.hour)
+        return DateSpan.on(today + timedelta(days=_RELATIVE_DAYS[phrase]))
+
+    for name, sign in (("ahead", 1), ("from_now", 1), ("ago", -1)):
+        if group(name):
+            count, unit = _count(group(f"{name}_n")), group(f"{name}_unit").lower()
+            if unit.startswith("h"):
+                return DateSpan.on((now + timedelta(hours=count)).date(), count)
+            days = count * (7 if unit.startswith("w") else 1)
+            return DateSpan.on(today + timedelta(days=sign * days))
+
+    if group("next_days"):
+        return DateSpan(today, today + timedelta(days=max(_count(group("next_days_n")), 1) - 1))
+    if group("weekend"):
+        modifier = group("weekend_mod")
+        return _weekend(today, modifier.lower() if modifier else None)
+    if group("week"):
+        monday = today - timedelta(days=today.weekday())
+        monday += timedelta(days={"this": 0, "next": 7, "last": -7}[group("week_mod").lower()])
+        return DateSpan(max(monday, today) if group("week_mod").lower() == "this" else monday,
+                        monday + timedelta(days=6))
+    modifier = group("weekday_mod")
+    return _weekday(today, group("weekday_name"), modifier.lower() if modifier else None)
+
+
+def parse_date(text: str, now: Optional[datetime] = None) -> Optional[DateSpan]:
+    """
+    Find the first date/time expression in free text and normalize it to a DateSpan.
+
+    Handles ISO and numeric dates, month-name dates, relative days, weekdays,
+    "in N hours/days", weekends, weeks and "X to Y" ranges. Returns None if the
+    text has no date expression.
+    """
+    now = now or datetime.now()
+    for match in _DATE_PATTERN.finditer(text):
+        try:
+            span = _resolve(match, now)
+        except ValueError:
+            continue
+
+        # "X to Y": extend to the second expression if one follows directly
+        joiner = _RANGE_JOINER.match(text, match.end())
+        if joiner and not span.is_range and not span.hours_offset:
+            second = _DATE_PATTERN.match(text, joiner.end())
+            if second:
+                try:
+                    # A weekday ends the range on its first occurrence after the start: "friday to sunday"
+                    base = datetime.combine(span.start, now.time()) if second.group("weekday") else now
+                    end = _resolve(second, base)
+                    if end.end > span.start:
+                        span = DateSpan(span.start, end.end)
+                except ValueError:
+                    pass
+        return span
+    return None
@@ -0,0 +1,111 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+
+class ForecastIndex:
+    """
+    Time-indexed view of an OpenWeather 5 day / 3 hour forecast payload.
+
+    The payload is parsed once into sorted parallel arrays so point lookups are
+    binary searches and day windows are contiguous slices.
+    """
+
+    __slots__ = ("city", "tz", "times", "temp", "feels_like", "humidity", "wind", "conditions")
+
+    # Slots are 3 hours apart; a target further than this from every slot has no data
+    MAX_GAP = 3 * 3600
+
+    def __init__(self, city: str, tz_offset: int = 0):
+        self.city = city
+        self.tz = timezone(timedelta(seconds=tz_offset))
+        self.times = array("d")
+        self.temp = array("d")
+        self.feels_like = array("d")
+        self.humidity = array("d")
+        self.wind = array("d")
+        self.conditions = []
+
+    @classmethod
+    def from_payload(cls, data: dict) -> "ForecastIndex":
+        """Build the index from a /forecast response"""
+        city = data.get("city", {})
+        index = cls(city.get("name", "Unknown location"), city.get("timezone", 0))
+        for item in sorted(data.get("list", []), key=lambda item: item["dt"]):
+            index.times.append(item["dt"])
+            index.temp.append(item["main"]["temp"])
+            index.feels_like.append(item["main"]["feels_like"])
+            index.humidity.append(item["main"]["humidity"])
+            index.wind.append(item["wind"]["speed"])
+            index.conditions.append(item["weather"][0]["description"])
+        return index
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def nearest(self, when: datetime, max_gap: Optional[float] = None) -> Optional[int]:
+        """Get the position of the slot closest to a moment, or None if none is within max_gap seconds"""
+        if not self.times:
+            return None
+        ts = when.timestamp()
+        pos = bisect_left(self.times, ts)
+        candidates = [i for i in (pos - 1, pos) if 0 <= i < len(self.times)]
+        best = min(candidates, key=lambda i: abs(self.times[i] - ts))
+        return best if abs(self.times[best] - ts) <= (self.MAX_GAP if max_gap is None else max_gap) else None
+
+    def at(self, when: datetime, interpolate: bool = True) -> Optional[dict]:
+        """
+        Get the forecast for a moment.
+
+        Numeric fields are linearly interpolated between the surrounding slots when
+        `interpolate` is set; the condition is taken from the nearest slot.
+        """
+        nearest = self.nearest(when)
+        if nearest is None:
+            return None
+
+        ts = when.timestamp()
+        point = {
+            "time": datetime.fromtimestamp(ts, self.tz),
+            "condition": self.conditions[nearest],
+            "temp": self.temp[nearest],
+            "feels_like": self.feels_like[nearest],
+            "humidity": self.humidity[nearest],
+            "wind": self.wind[nearest]
+        }
+
+        pos = bisect_left(self.times, ts)
+        if interpolate and 0 < pos < len(self.times) and self.times[pos] != ts:
+            t0, t1 = self.times[pos - 1], self.times[pos]
+            weight = (ts - t0) / (t1 - t0)
+            for field in ("temp", "feels_like", "humidity", "wind"):
+                values = getattr(self, field)
+                point[field] = round(values[pos - 1] + (values[pos] - values[pos - 1]) * weight, 1)
+        return point
+
+    def day_summary(self, day: date) -> Optional[dict]:
+        """Aggregate every slot falling on a calendar day in the city's local time"""
+        start = datetime(day.year, day.month, day.day, tzinfo=self.tz).timestamp()
+        lo = bisect_left(self.times, start)
+        hi = bisect_left(self.times, start + 86400)
+        if lo == hi:
+            return None
+
+        temps = self.temp[lo:hi]
+        count = hi - lo
+        return {
+            "date": day,
+            "slots": count,
+            "condition": Counter(self.conditions[lo:hi]).most_common(1)[0][0],
+            "temp_min": min(temps),
+            "temp_max": max(temps),
+            "temp_mean": round(sum(temps) / count, 1),
+            "humidity_mean": round(sum(self.humidity[lo:hi]) / count, 1),
+            "wind_max": max(self.wind[lo:hi])
+        }
+
+    def local_today(self) -> date:
+        """Get the current calendar date in the city's timezone"""
+        return datetime.now(self.tz).date()
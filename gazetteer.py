@@ -0,0 +1,121 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+from config import Config
+
+_TOKEN_RE = re.compile(r"[\w']+")
+_TERMINAL = "\0"
+
+
+class Gazetteer:
+    """
+    Offline city matcher over a token trie of names and aliases.
+
+    Matching is a single leftmost-longest scan over the prompt's tokens, so
+    resolving "weather in new york tomorrow" costs microseconds instead of an LLM call.
+    """
+
+    _default: Optional["Gazetteer"] = None
+    _default_lock = threading.Lock()
+
+    def __init__(self):
+        self._root: Dict = {}
+        self._stats_lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.ambiguous = 0
+
+    @classmethod
+    def default(cls) -> "Gazetteer":
+        """Get the process-wide gazetteer loaded from Config.GAZETTEER_PATH"""
+        if cls._default is None:
+            with cls._default_lock:
+                if cls._default is None:
+                    cls._default = cls.from_file(Config.GAZETTEER_PATH)
+        return cls._default
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        """
+        Load a city list where each line is `canonical|alias|alias...`.
+
+        Blank lines and lines starting with '#' are ignored. Aliases written in
+        ALL CAPS (abbreviations like NY) only match capitalized text.
+        """
+        gazetteer = cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    names = [name.strip() for name in line.split("|") if name.strip()]
+                    canonical = names[0].lower()
+                    for name in names:
+                        gazetteer.add(name, canonical)
+        except OSError as e:
+            print(f"Could not load gazetteer from {path}: {e}")
+        return gazetteer
+
+    def add(self, name: str, canonical: str):
+        """Register a name (or alias) for a canonical city"""
+        case_sensitive = name.isupper()
+        node = self._root
+        for token in _TOKEN_RE.findall(name):
+            node = node.setdefault(token if case_sensitive else token.lower(), {})
+        node[_TERMINAL] = canonical
+
+    def find_all(self, text: str) -> List[str]:
+        """Get the canonical names of all non-overlapping leftmost-longest matches, in order"""
+        tokens = _TOKEN_RE.findall(text)
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            end, canonical = i, None
+            j = i
+            while j < len(tokens):
+                token = tokens[j]
+                child = node.get(token.lower())
+                if child is None and token.isupper():
+                    child = node.get(token)
+                if child is None:
+                    break
+                node = child
+                j += 1
+                if _TERMINAL in node:
+                    end, canonical = j, node[_TERMINAL]
+            if canonical is not None:
+                matches.append(canonical)
+                i = end
+            else:
+                i += 1
+        return matches
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Resolve the single city a prompt refers to.
+
+        Returns None when nothing matches or when several different cities do,
+        leaving those prompts to the LLM extractor.
+        """
+        cities = list(dict.fromkeys(self.find_all(text)))
+        with self._stats_lock:
+            self.lookups += 1
+            if len(cities) == 1:
+                self.hits += 1
+            elif cities:
+                self.ambiguous += 1
+        return cities[0] if len(cities) == 1 else None
+
+    def stats(self) -> dict:
+        """Get lookup counters and the hit rate"""
+        with self._stats_lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "ambiguous": self.ambiguous,
+                "misses": self.lookups - self.hits - self.ambiguous,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0
+            }
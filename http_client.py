@@ -0,0 +1,91 @@
+import asyncio
+import concurrent.futures
+import threading
+import weakref
+from typing import Any, Coroutine, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import Config
+
+
+class AsyncHttpClient:
+    """
+    Shared keep-alive asyncio HTTP transport.
+
+    Each provider host gets its own pooled client per running event loop, so one slow
+    provider can use at most HTTP_MAX_CONNECTIONS_PER_HOST connections and never
+    starves the others.
+    """
+
+    _clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+    @classmethod
+    def _create_client(cls) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                Config.HTTP_READ_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT, pool=Config.HTTP_POOL_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_PER_HOST
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=Config.HTTP_MAX_RETRIES),
+            headers={"User-Agent": Config.HTTP_USER_AGENT}
+        )
+
+    @classmethod
+    def client(cls, url: str) -> httpx.AsyncClient:
+        """Get (or lazily create) the pooled client for the host of a URL on the current event loop"""
+        loop = asyncio.get_running_loop()
+        host = urlsplit(url).netloc
+        with cls._lock:
+            clients = cls._clients.setdefault(loop, {})
+            client = clients.get(host)
+            if client is None:
+                client = cls._create_client()
+                clients[host] = client
+        return client
+
+    @classmethod
+    async def get(cls, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> httpx.Response:
+        """Issue a GET through the host's pool with the configured timeouts"""
+        return await cls.client(url).get(url, params=params, headers=headers)
+
+    @classmethod
+    async def aclose(cls):
+        """Close the pooled clients of the current event loop"""
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            clients = cls._clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_lock = threading.Lock()
+
+
+def run_in_background(coro: Coroutine) -> "concurrent.futures.Future":
+    """
+    Schedule a coroutine on the shared background event loop without waiting for it.
+
+    Reusing one long-lived loop keeps AsyncHttpClient's pools (and any loop-bound
+    client) warm across calls and works whether or not the caller's thread already
+    has a running loop.
+    """
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_background_loop.run_forever, name="http-client-loop", daemon=True
+            ).start()
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop)
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """Run a coroutine from synchronous code on the shared background event loop and wait for its result"""
+    return run_in_background(coro).result()
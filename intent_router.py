@@ -0,0 +1,68 @@
+import re
+import threading
+from collections import Counter
+
+from config import Config
+
+# A prompt is a plain lookup when it asks about the weather...
+_WEATHER_TERMS = re.compile(
+    r"\b(weather|forecast|temperature|temp|hot|cold|warm|rain|raining|rainy|humid|humidity|"
+    r"wind|windy|sunny|cloudy|like)\b",
+    re.IGNORECASE
+)
+# ...and does not ask for advice, explanation or comparison
+_OPEN_ENDED_TERMS = re.compile(
+    r"\b(should|advice|advise|recommend|suggest|wear|bring|umbrella|plan|why|how come|explain|"
+    r"compare|better|worse|versus|vs|safe|good time|best)\b",
+    re.IGNORECASE
+)
+
+
+class IntentRouter:
+    """
+    Decides whether a request can bypass the ReAct agent.
+
+    Simple lookups with a confidently parsed location go straight to the weather
+    functions; everything else is left to the full agent. Counts every decision.
+    """
+
+    DIRECT = "direct"
+    AGENT = "agent"
+    CACHE = "cache"
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_simple_lookup(prompt: str) -> bool:
+        """Check whether a prompt is a plain weather lookup rather than an open-ended question"""
+        return (
+            len(prompt.split()) <= Config.ROUTER_MAX_WORDS
+            and _WEATHER_TERMS.search(prompt) is not None
+            and _OPEN_ENDED_TERMS.search(prompt) is None
+        )
+
+    def route(self, request) -> str:
+        """Pick the path for a request and record the decision"""
+        path = self.AGENT
+        if self.is_simple_lookup(request.prompt) and request.location_source in Config.ROUTER_TRUSTED_SOURCES:
+            path = self.DIRECT
+        self.record(path)
+        return path
+
+    def record(self, path: str):
+        with self._lock:
+            self._counts[path] += 1
+
+    def stats(self) -> dict:
+        """Get how many requests took each path"""
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                "direct": self._counts[self.DIRECT],
+                "agent": self._counts[self.AGENT],
+                "cache": self._counts[self.CACHE],
+                "direct_rate": self._counts[self.DIRECT] / total if total else 0.0,
+                "cache_rate": self._counts[self.CACHE] / total if total else 0.0
+            }
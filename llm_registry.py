@@ -0,0 +1,71 @@
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from config import Config
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+class LLMRegistry:
+    """Process-wide, thread-safe cache of chat model clients keyed by their settings"""
+
+    _clients: Dict[Tuple, "ChatGoogleGenerativeAI"] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, model: Optional[str] = None, temperature: Optional[float] = None,
+            max_output_tokens: Optional[int] = None) -> "ChatGoogleGenerativeAI":
+        """Get the shared client for a model configuration, creating it on first use"""
+        key = (
+            model or Config.LLM_MODEL,
+            Config.LLM_TEMPERATURE if temperature is None else temperature,
+            max_output_tokens
+        )
+        client = cls._clients.get(key)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                    client = ChatGoogleGenerativeAI(
+                        model=key[0],
+                        temperature=key[1],
+                        max_output_tokens=key[2],
+                        google_api_key=Config.GEMINI_API_KEY
+                    )
+                    cls._clients[key] = client
+        return client
+
+    @classmethod
+    def get_extraction_llm(cls) -> "ChatGoogleGenerativeAI":
+        """Get the cheaper, deterministic client used for auxiliary tasks like location extraction"""
+        return cls.get(
+            model=Config.EXTRACTION_LLM_MODEL,
+            temperature=Config.EXTRACTION_LLM_TEMPERATURE,
+            max_output_tokens=Config.EXTRACTION_LLM_MAX_TOKENS
+        )
+
+    @classmethod
+    def get_summary_llm(cls) -> "ChatGoogleGenerativeAI":
+        """Get the deterministic client that condenses older chat turns into a running summary"""
+        return cls.get(
+            model=Config.EXTRACTION_LLM_MODEL,
+            temperature=Config.EXTRACTION_LLM_TEMPERATURE,
+            max_output_tokens=Config.MEMORY_SUMMARY_MAX_TOKENS
+        )
+
+    @classmethod
+    def warm(cls, ping: bool = False):
+        """
+        Create the main and extraction clients ahead of the first user message.
+
+        With `ping`, also send a one-token request through each client so the
+        connection to the API is established before it is needed.
+        """
+        for client in (cls.get(), cls.get_extraction_llm()):
+            if ping:
+                try:
+                    client.invoke("ping")
+                except Exception as e:
+                    print(f"LLM warm-up failed: {e}")
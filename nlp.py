@@ -0,0 +1,77 @@
+import hashlib
+import os
+import threading
+from typing import NamedTuple, Tuple
+
+from cache import TTLCache
+from config import Config
+
+# NLTK resources TextBlob needs for tokenizing and tagging (older and newer NLTK names)
+NLTK_RESOURCES = ("punkt", "punkt_tab", "averaged_perceptron_tagger", "averaged_perceptron_tagger_eng")
+
+
+class PromptAnalysis(NamedTuple):
+    """Everything the agent needs from NLP for one prompt"""
+    sentiment: float
+    subjectivity: float
+    tokens: Tuple[str, ...]
+    tags: Tuple[Tuple[str, str], ...]
+
+
+_analyses = TTLCache(maxsize=Config.NLP_CACHE_SIZE)
+_textblob_class = None
+_load_lock = threading.Lock()
+
+
+def _load_textblob():
+    """Import TextBlob on first use, pointing NLTK at the bundled corpora"""
+    global _textblob_class
+    if _textblob_class is None:
+        with _load_lock:
+            if _textblob_class is None:
+                import nltk
+                if os.path.isdir(Config.NLTK_DATA_PATH) and Config.NLTK_DATA_PATH not in nltk.data.path:
+                    nltk.data.path.insert(0, Config.NLTK_DATA_PATH)
+                from textblob import TextBlob
+                _textblob_class = TextBlob
+    return _textblob_class
+
+
+def analyze(prompt: str, tagging: bool = False) -> PromptAnalysis:
+    """
+    Run sentiment, and with `tagging` also tokenization and POS tagging, over a prompt in one pass.
+
+    Results are cached by prompt hash, so every step of a request shares one analysis.
+    Tokens and tags are left empty when not requested or when the NLTK corpora are not installed.
+    """
+    key = f"{hashlib.sha1(prompt.encode('utf-8')).hexdigest()}:{int(tagging)}"
+    analysis = _analyses.get(key)
+    if analysis is not None:
+        return analysis
+
+    blob = _load_textblob()(prompt)
+    sentiment = blob.sentiment
+    tags, tokens = (), ()
+    if tagging:
+        try:
+            tags = tuple(blob.tags)
+            tokens = tuple(word for word, _ in tags)
+        except LookupError as e:
+            print(f"NLTK data missing, skipping tagging (run `python nlp.py` to install it): {e}")
+
+    analysis = PromptAnalysis(sentiment.polarity, sentiment.subjectivity, tokens, tags)
+    _analyses.set(key, analysis, float("inf"))
+    return analysis
+
+
+def download_corpora(path: str = Config.NLTK_DATA_PATH):
+    """Download the NLTK resources into `path` so the app runs without network access"""
+    import nltk
+    os.makedirs(path, exist_ok=True)
+    for name in NLTK_RESOURCES:
+        nltk.download(name, download_dir=path, quiet=True)
+
+
+if __name__ == "__main__":
+    download_corpora()
+    print(f"NLTK data installed in {Config.NLTK_DATA_PATH}")
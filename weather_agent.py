@@ -1,55 +1,229 @@
 from database import WeatherHistoryDB
-from textblob import TextBlob
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import initialize_agent, AgentType
-from langchain.agents import Tool
 from config import Config
-from weather_functions import WeatherFunctions
-import nltk
-from datetime import datetime, timedelta
-from langchain_core.prompts import ChatPromptTemplate
+from llm_registry import LLMRegistry
+from gazetteer import Gazetteer
+from intent_router import IntentRouter
+from conversation_memory import ConversationMemory
+from weather_functions import WeatherFunctions, HistoricalWeather
+from http_client import run_in_background
+from cache import TTLCache, normalize_location
+from nlp import PromptAnalysis, analyze
+from date_parser import DateSpan, parse_date
+from datetime import datetime
 import requests
+import queue
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import cached_property
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+class StreamEvent(NamedTuple):
+    """
+    One item of WeatherAgent.run_stream.
+
+    kind is 'status' (progress note), 'emoji' (sentiment prefix), 'answer' (the next
+    piece of answer text) or 'replace' (the full answer, superseding the pieces so far).
+    """
+    kind: str
+    text: str
+
+
+# The request being answered; tools read it from executor threads, which copy the caller's context
+_current_request_var: ContextVar[Optional["RequestContext"]] = ContextVar("current_request", default=None)
+
+
+class FinalAnswerExtractor:
+    """
+    Pull the final answer out of one streamed agent LLM step as it is generated.
+
+    Understands both the plain ReAct format ("Final Answer: ...") and the structured-chat
+    JSON format ({"action": "Final Answer", "action_input": "..."}).
+    """
+
+    _PLAIN = re.compile(r"Final Answer:\s*")
+    _STRUCTURED = re.compile(r'"action"\s*:\s*"Final Answer"\s*,\s*"action_input"\s*:\s*"')
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
 
-class WeatherAgent:
     def __init__(self):
-        self.llm = self._initialize_llm()
-        self.agent = self._initialize_agent()
+        self.text = ""
+        self.answer = ""
+        self._start: Optional[int] = None
+        self._json = False
+
+    def feed(self, chunk: str) -> str:
+        """Add the next chunk of model output and get the answer text it completes"""
+        self.text += chunk
+        if self._start is None:
+            match = self._STRUCTURED.search(self.text)
+            if match is not None:
+                self._start, self._json = match.end(), True
+            else:
+                match = self._PLAIN.search(self.text)
+                # Wait for text after the marker so leading whitespace is skipped
+                if match is None or match.end() == len(self.text):
+                    return ""
+                self._start = match.end()
+        raw = self.text[self._start:]
+        answer = self._decode(raw) if self._json else raw
+        new, self.answer = answer[len(self.answer):], answer
+        return new
+
+    @classmethod
+    def _decode(cls, raw: str) -> str:
+        """Decode a JSON string body up to its closing quote, stopping before an incomplete escape"""
+        out = []
+        i = 0
+        while i < len(raw) and raw[i] != '"':
+            if raw[i] != "\\":
+                out.append(raw[i])
+                i += 1
+            elif i + 1 >= len(raw) or (raw[i + 1] == "u" and i + 6 > len(raw)):
+                break
+            elif raw[i + 1] == "u":
+                out.append(chr(int(raw[i + 2:i + 6], 16)))
+                i += 6
+            else:
+                out.append(cls._ESCAPES.get(raw[i + 1], raw[i + 1]))
+                i += 2
+        return "".join(out)
+
+
+class RequestContext:
+    """
+    Parsed view of a single user prompt.
+
+    Location, date and the NLP analysis are computed lazily and at most once, so
+    the context step, the weather tool and chat naming all share one extraction.
+    `history` holds the chat's earlier messages for the conversation memory.
+    """
+
+    def __init__(self, agent: "WeatherAgent", prompt: str, chat_id: Optional[str] = None,
+                 history: Optional[List[Dict]] = None):
+        self.agent = agent
+        self.prompt = prompt
+        self.chat_id = chat_id
+        self.history = list(history or [])
+        self.route: Optional[str] = None
+
+    @cached_property
+    def _resolved_location(self) -> Tuple[str, str]:
+        return self.agent._resolve_location(self.prompt)
+
+    @property
+    def location(self) -> str:
+        return self._resolved_location[0]
+
+    @property
+    def location_source(self) -> str:
+        """Where the location came from: 'gazetteer', 'llm', 'ip' or 'none'"""
+        return self._resolved_location[1]
+
+    @cached_property
+    def date_span(self) -> DateSpan:
+        return self.agent._extract_date_span(self.prompt)
+
+    @property
+    def date(self) -> str:
+        return self.date_span.label()
+
+    @property
+    def hours_offset(self) -> int:
+        return self.date_span.hours_offset
+
+    @cached_property
+    def analysis(self) -> PromptAnalysis:
+        return analyze(self.prompt)
+
+    @property
+    def sentiment(self) -> float:
+        return self.analysis.sentiment
+
+
+class WeatherAgent:
+    # Failure and clarification messages must not be served from the answer cache
+    _UNCACHEABLE_PREFIXES = ("⚠️", "Could not", "No weather", "No forecast", "Please")
+
+    def __init__(self, warm_up: bool = True):
+        self._llm = None
+        self._agent = None
+        self._init_lock = threading.Lock()
         self.db = WeatherHistoryDB()
-        self._setup_nltk()
+        self.router = IntentRouter()
+        self.answer_cache = TTLCache(maxsize=Config.ANSWER_CACHE_MAXSIZE)
+        self.memory = ConversationMemory(self.db)
+        if warm_up:
+            # Build the LLM clients and the LangChain agent off the startup path
+            threading.Thread(target=self.warm_up, name="agent-warmup", daemon=True).start()
 
-    def _setup_nltk(self):
-        """Ensure required NLTK data is downloaded"""
+    def warm_up(self):
+        """Create the LLM clients and the ReAct agent ahead of the first message that needs them"""
         try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('taggers/averaged_perceptron_tagger')
-        except LookupError:
-            nltk.download('punkt')
-            nltk.download('averaged_perceptron_tagger')
-   
+            LLMRegistry.warm(ping=Config.LLM_WARMUP_PING)
+            self.agent
+        except Exception as e:
+            print(f"Agent warm-up failed: {e}")
+
+    @property
+    def llm(self):
+        """The shared language model client, created on first use"""
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    self._llm = self._initialize_llm()
+        return self._llm
+
+    @property
+    def agent(self):
+        """The LangChain ReAct agent, built on first use; direct and cached answers never need it"""
+        if self._agent is None:
+            llm = self.llm
+            with self._init_lock:
+                if self._agent is None:
+                    self._agent = self._initialize_agent(llm)
+        return self._agent
+
+    def parse_request(self, prompt: str, chat_id: Optional[str] = None,
+                      history: Optional[List[Dict]] = None) -> RequestContext:
+        """Create the per-request context for a prompt, optionally within a chat's history"""
+        return RequestContext(self, prompt, chat_id, history)
+
+    def _current_request(self) -> Optional[RequestContext]:
+        """Get the request being handled by run() in this context, if any"""
+        return _current_request_var.get()
+
     def _initialize_llm(self):
-        """Initialize the language model"""
-        return ChatGoogleGenerativeAI(
-            model=Config.LLM_MODEL,
-            temperature=Config.LLM_TEMPERATURE,
-            google_api_key=Config.GEMINI_API_KEY
-            # convert_system_message_to_human=True
-        )
+        """Get the shared language model client"""
+        return LLMRegistry.get()
     
-    def _initialize_agent(self):
+    def _initialize_agent(self, llm):
         """Initialize the agent with tools"""
+        from langchain.agents import initialize_agent, AgentType, Tool
+
         weather_tool = Tool(
             name="GetWeather",
             func=self.get_weather_tool,
             description=(
                 "Useful for getting weather information. "
-                "Input should contain location and date (today/tomorrow/yesterday/actual date). "
+                "Input should contain location and date (today/tomorrow/day after tomorrow/yesterday/actual date). "
                 "Example: 'What's the weather in New York tomorrow?'"
             )
         )
         
+        compare_tool = Tool(
+            name="CompareWeather",
+            func=self.compare_weather_tool,
+            description=(
+                "Useful for getting the current weather of several cities at once. "
+                "Input should be a comma-separated list of cities. "
+                "Example: 'Dhaka, Chittagong, Sylhet'"
+            )
+        )
+        
         return initialize_agent(
-            tools=[weather_tool],
-            llm=self.llm,
+            tools=[weather_tool, compare_tool],
+            llm=llm,
             agent_type=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
             verbose=True,
             max_iterations=5,
@@ -60,170 +234,405 @@ class WeatherAgent:
     def get_weather_tool(self, input_str: str) -> str:
         """Enhanced tool function with better error handling and retry logic"""
         try:
-            location, date = self.extract_location_and_date(input_str)
+            location, span = self._parse_tool_input(input_str)
             if not location:
                 return "Please specify a valid location."
                 
-            if not date:
-                date = "today"  # Default to today if no date specified
-                
-            # Get weather data with retry logic
-            max_retries = 2
-            data = None
-            
-            for attempt in range(max_retries):
-                try:
-                    if date == "today":
-                        data = WeatherFunctions.get_current_weather(location)
-                    elif date == "yesterday":
-                        data = WeatherFunctions.get_historical_weather(location)
-                    elif date == "tomorrow":
-                        data = WeatherFunctions.get_weather_forecast(location)
-                    else:  # Actual date string
-                        data = WeatherFunctions.get_historical_weather(location)
-                    
-                    if data:
-                        break
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        return f"⚠️ Failed to get weather data after {max_retries} attempts: {str(e)}"
-                    continue
-            
-            if not data:
-                return "Could not retrieve weather data."
-            if date != "yesterday" :    
-                response = WeatherFunctions.process_weather_data(data, date)
-            else:
-                response=WeatherFunctions.process_weather_response_historical(data)
-            # Enhanced database logging with sentiment
-            # self.db.save_query(
-            #     input_str=input_str,
-            #     response=response,
-            #     location=location,
-            #     date=date,
-            #     sentiment=TextBlob(input_str).sentiment.polarity
-            # )
-            
-            return response
+            return self.fetch_weather_span(location, span)
             
         except Exception as e:
             return f"⚠️ Error processing weather request: {str(e)}"
 
-    def extract_location_and_date(self, prompt: str) -> tuple:
-        """Enhanced extraction supporting both relative and absolute dates"""
-        try:
-            # First try to find date keywords
-            date_keywords = {
-                "today": "today",
-                "tomorrow": "tomorrow",
-                "yesterday": "yesterday",
-                "now": "today",
-                "current": "today"
-            }
+    def _parse_tool_input(self, input_str: str) -> Tuple[str, DateSpan]:
+        """
+        Get the location and date span the agent's tool input asks about.
+
+        The tool input is parsed on its own, since the agent may look up a different
+        city or day than the prompt names. The prompt's parse is reused only where the
+        input gives no location or date, or names the same one. The LLM is asked only
+        about input naming a place the gazetteer does not know, and never falls back to IP.
+        """
+        request = self._current_request()
+        location = Gazetteer.default().match(input_str)
+        if request is not None and request.location:
+            prompt_location = self._compact(request.location)
+            if not location and prompt_location in self._compact(input_str):
+                location = request.location  # "New York" restates an extracted "newyork"
+            elif not location:
+                location = self._extract_location_llm(input_str) or request.location
+            if self._compact(location) == prompt_location:
+                location = request.location
+        elif not location:
+            location = self._extract_location(input_str)
+
+        span = parse_date(input_str)
+        if request is not None and (span is None or span.start == request.date_span.start):
+            # Keep the prompt's range or hour offset when the input only restates its first day
+            span = request.date_span
+        return location, span or DateSpan.today()
+
+    @staticmethod
+    def _compact(text: str) -> str:
+        """Lowercase a place name and drop spaces and punctuation, so 'New York' matches 'newyork'"""
+        return re.sub(r"[\W_]+", "", text.lower())
+
+    def fetch_weather_span(self, location: str, span: DateSpan) -> str:
+        """Fetch weather for every day of a parsed date span (capped at DATE_RANGE_MAX_DAYS)"""
+        if not span.is_range:
+            return self.fetch_weather(location, span.label(), span.hours_offset)
+
+        days = list(span.days())[:Config.DATE_RANGE_MAX_DAYS]
+        return "\n\n".join(self.fetch_weather(location, DateSpan.on(day).label()) for day in days)
+
+    def fetch_weather(self, location: str, date: Optional[str], hours_offset: int = 0) -> str:
+        """Fetch weather for a location and date (plus an optional hour offset from now) and render it as text, with retry logic"""
+        if not date:
+            date = "today"  # Default to today if no date specified
+        
+        # One cached 5-day forecast serves every present/future view
+        if Config.UNIFIED_FORECAST and WeatherFunctions.is_forecast_date(date):
+            return WeatherFunctions.get_forecast_view(location, date, hours_offset)
             
-            found_date = None
-            for keyword, date_value in date_keywords.items():
-                if keyword in prompt.lower():
-                    found_date = date_value
+        # Get weather data with retry logic
+        max_retries = 2
+        data = None
+        
+        for attempt in range(max_retries):
+            try:
+                if date == "today" and hours_offset:
+                    data = WeatherFunctions.get_forecast_index(location)
+                elif date == "today":
+                    data = WeatherFunctions.get_current_weather(location)
+                elif date == "yesterday":
+                    data = WeatherFunctions.get_historical_weather(location)
+                elif date == "tomorrow":
+                    data = WeatherFunctions.get_forecast_index(location)
+                else:  # Actual date string
+                    data = WeatherFunctions.get_historical_weather(
+                        location, datetime.strptime(date, "%Y-%m-%d")
+                    )
+                
+                if data:
                     break
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    return f"⚠️ Failed to get weather data after {max_retries} attempts: {str(e)}"
+                continue
+        
+        if not data:
+            return "Could not retrieve weather data."
+        if isinstance(data, HistoricalWeather):
+            return data.render()
+        return WeatherFunctions.process_weather_data(data, date, hours_offset)
+
+    def compare_weather_tool(self, input_str: str) -> str:
+        """Tool function fetching current weather for several cities in one batch"""
+        try:
+            locations = [
+                part.strip() for part in re.split(r",|;|&|\band\b|\bvs\.?", input_str, flags=re.IGNORECASE)
+                if part.strip()
+            ]
+            if not locations:
+                return "Please specify at least one location."
             
-            # Extract location using NLP
-            location = self._extract_location(prompt)
-            
-            # If no date keyword found, try to parse actual date
-            if not found_date:
-                try:
-                    blob = TextBlob(prompt)
-                    for word, tag in blob.tags:
-                        if tag == 'CD':  # Cardinal number (potential date component)
-                            try:
-                                date_obj = datetime.strptime(word, "%Y-%m-%d").date()
-                                today = datetime.now().date()
-                                
-                                if date_obj == today:
-                                    found_date = "today"
-                                elif date_obj == today + timedelta(days=1):
-                                    found_date = "tomorrow"
-                                elif date_obj == today - timedelta(days=1):
-                                    found_date = "yesterday"
-                                else:
-                                    found_date = word  # Use the raw date string
-                                break
-                            except ValueError:
-                                continue
-                except Exception:
-                    pass
+            results = WeatherFunctions.get_current_weather_batch(locations)
             
-            return location, found_date if found_date else "today"
+            sections = []
+            for location, result in results.items():
+                if result["error"]:
+                    sections.append(f"⚠️ {location}: {result['error']}")
+                else:
+                    sections.append(WeatherFunctions.process_weather_data(result["data"]))
+            return "\n\n".join(sections)
             
+        except Exception as e:
+            return f"⚠️ Error processing weather comparison: {str(e)}"
+
+    def extract_location_and_date(self, prompt: str) -> tuple:
+        """Enhanced extraction supporting both relative and absolute dates"""
+        try:
+            return self._extract_location(prompt), self._extract_date(prompt)
         except Exception:
             return None, None
 
+    def _extract_date(self, prompt: str) -> str:
+        """Find the date the prompt asks about as a relative label or yyyy-mm-dd date, defaulting to today"""
+        return self._extract_date_span(prompt).label()
+        
+    def _extract_date_span(self, prompt: str) -> DateSpan:
+        """Parse the first date/time expression of the prompt, defaulting to today"""
+        return parse_date(prompt) or DateSpan.today()
+
     def _extract_location(self, text: str) -> str:
-        """Improved location extraction using NLP with IP fallback"""
-        try:
-            # First try to extract location using LLM
-            model = self._initialize_llm()
-            
-            chatTemplate = ChatPromptTemplate.from_template(
-                "Extract the location from the following text: {text}\n"
-                "Return answer in a single word format like 'dhaka', 'newyork', 'paris' etc.\n"
-                "Convert abbreviations like 'NY' to 'newyork'.\n"
-                "If no location is mentioned, return 'none'."
-            )
+        """Improved location extraction: offline gazetteer first, then LLM, then IP fallback"""
+        return self._resolve_location(text)[0]
 
-            messages = chatTemplate.format_messages(text=text)
-            response = model(messages)
-            location = response.content.strip().lower()
-            
-            print(f"Extracted location: {location}")
+    def _resolve_location(self, text: str) -> Tuple[str, str]:
+        """Extract a location and report its source ('gazetteer', 'llm', 'ip' or 'none')"""
+        # Resolve well-known cities locally; ambiguous or unknown prompts go to the LLM
+        location = Gazetteer.default().match(text)
+        if location:
+            print(f"Gazetteer location: {location}")
+            return location, "gazetteer"
+        
+        try:
+            # Then try to extract location using LLM
+            location = self._ask_llm_for_location(text)
 
             # If location extraction failed or returned 'none', fall back to IP lookup
-            if not location or location == 'none':
+            if not location:
                 print("Falling back to IP-based location detection")
                 location, _ = WeatherFunctions.get_location_from_ip()
                 location = location.lower() if location else ""
                 print(f"IP-based location: {location}")
+                return location, "ip" if location else "none"
             
-            return location
+            return location, "llm"
             
         except Exception as e:
             print(f"Error in location extraction: {e}")
             try:
                 # Fall back to IP lookup if any error occurs
                 location, _ = WeatherFunctions.get_location_from_ip()
-                return location.lower() if location else ""
+                return (location.lower(), "ip") if location else ("", "none")
             except Exception as e:
                 print(f"Error in IP-based location detection: {e}")
-                return ""
+                return "", "none"
 
-    def run(self, prompt: str) -> str:
+    def _ask_llm_for_location(self, text: str) -> str:
+        """Ask the extraction LLM for the location in a text; empty if it names none"""
+        from langchain_core.prompts import ChatPromptTemplate
+        model = LLMRegistry.get_extraction_llm()
+        
+        chatTemplate = ChatPromptTemplate.from_template(
+            "Extract the location from the following text: {text}\n"
+            "Return answer in a single word format like 'dhaka', 'newyork', 'paris' etc.\n"
+            "Convert abbreviations like 'NY' to 'newyork'.\n"
+            "If no location is mentioned, return 'none'."
+        )
+
+        messages = chatTemplate.format_messages(text=text)
+        response = model.invoke(messages)
+        location = response.content.strip().lower()
+        
+        print(f"Extracted location: {location}")
+        return "" if location == "none" else location
+
+    def _extract_location_llm(self, text: str) -> str:
+        """LLM-only location extraction without the IP fallback; empty on failure"""
+        try:
+            return self._ask_llm_for_location(text)
+        except Exception as e:
+            print(f"Error in location extraction: {e}")
+            return ""
+
+    def run(self, prompt: str, request: Optional[RequestContext] = None) -> str:
         """Run agent with enhanced context and sentiment analysis"""
+        emoji, answer = "", ""
+        for event in self.run_stream(prompt, request):
+            if event.kind == "emoji":
+                emoji = event.text
+            elif event.kind == "answer":
+                answer += event.text
+            elif event.kind == "replace":
+                answer = event.text
+        return emoji + answer
+
+    def run_stream(self, prompt: str, request: Optional[RequestContext] = None) -> Iterator[StreamEvent]:
+        """
+        Run the agent, yielding status updates while it works and the answer as it is generated.
+
+        The sentiment emoji is emitted first, before any weather lookup or LLM call.
+        Agent answers stream from the model's final step; cached and direct answers
+        are complete at once and arrive as a single 'answer' event.
+        """
+        request = request or self.parse_request(prompt)
+        _current_request_var.set(request)
         try:
-            # Get context from previous queries
-            context = self._get_context(prompt)
+            # Add emoji based on sentiment; applied per request, never cached
+            emoji = self._get_sentiment_emoji(request.sentiment)
+            yield StreamEvent("emoji", f"{emoji} ")
+            
+            # Repeat intents are answered from cache regardless of phrasing
+            intent_key, ttl = self._answer_cache_key(request)
+            if intent_key is not None:
+                cached = self.answer_cache.get(intent_key)
+                if cached is not None:
+                    request.route = IntentRouter.CACHE
+                    self.router.record(IntentRouter.CACHE)
+                    print(f"Route: {request.route}")
+                    self._remember(request, f"{emoji} {cached}")
+                    yield StreamEvent("answer", cached)
+                    return
+            
+            # Simple lookups skip the ReAct loop and answer from a template
+            response = None
+            streamed = False
+            if Config.ROUTER_ENABLED:
+                request.route = self.router.route(request)
+                print(f"Route: {request.route}")
+                if request.route == IntentRouter.DIRECT:
+                    yield StreamEvent("status", f"Checking the weather for {request.location}...")
+                    response = self.fetch_weather_span(request.location, request.date_span)
+            
+            if response is None:
+                # Get context from previous queries
+                context = self._get_context(request)
+                
+                # Run the agent with the chat memory and context that fit the token budget,
+                # reporting each tool call as it starts
+                enhanced_prompt = self.memory.build_prompt(
+                    prompt, chat_id=request.chat_id, history=request.history, context=context
+                )
+                yield StreamEvent("status", "Thinking...")
+                response = yield from self._stream_agent(enhanced_prompt, request)
+                streamed = True
             
-            # Add emoji based on sentiment
-            sentiment = TextBlob(prompt).sentiment
-            emoji = self._get_sentiment_emoji(sentiment.polarity)
+            if intent_key is not None and not response.startswith(self._UNCACHEABLE_PREFIXES):
+                self.answer_cache.set(intent_key, response, ttl)
             
-            # Run the agent with context if available
-            enhanced_prompt = f"{context}\n\nUser: {prompt}" if context else prompt
-            response = self.agent.run(enhanced_prompt)
+            # Enhanced database logging with sentiment; feeds _get_context for later requests
+            self._log_query(request, response)
+            self._remember(request, f"{emoji} {response}")
             
-            return f"{emoji} {response}"
+            if not streamed:
+                yield StreamEvent("answer", response)
             
         except Exception as e:
-            return f"⚠️ Error: {str(e)}"
+            yield StreamEvent("replace", f"⚠️ Error: {str(e)}")
+        finally:
+            _current_request_var.set(None)
+
+    def _stream_agent(self, enhanced_prompt: str, request: RequestContext) -> Iterator[StreamEvent]:
+        """
+        Run the ReAct agent on the background event loop, yielding tool statuses and
+        final-answer text as the model generates it. Returns the agent's output.
+        """
+        agent = self.agent
+        events: "queue.Queue[Optional[StreamEvent]]" = queue.Queue()
+        future = run_in_background(self._pump_agent_events(agent, enhanced_prompt, request, events))
+        streamed = ""
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                if event.kind == "answer":
+                    streamed += event.text
+                yield event
+            response = future.result() or ""
+        finally:
+            future.cancel()
+        
+        # Text from a step the agent then discarded, or parsed differently, is corrected here
+        if streamed.strip() == response.strip():
+            pass
+        elif response.startswith(streamed):
+            yield StreamEvent("answer", response[len(streamed):])
+        else:
+            yield StreamEvent("replace", response)
+        return response
+
+    async def _pump_agent_events(self, agent, enhanced_prompt: str, request: RequestContext,
+                                 events: "queue.Queue[Optional[StreamEvent]]") -> Optional[str]:
+        """Translate the agent's astream_events into StreamEvents on a queue; returns the final output"""
+        _current_request_var.set(request)  # Copied into the executor threads that run the tools
+        extractor = FinalAnswerExtractor()
+        root_id, output = None, None
+        try:
+            async for event in agent.astream_events({"input": enhanced_prompt}, version="v2"):
+                kind = event["event"]
+                root_id = root_id or event["run_id"]
+                if kind in ("on_chat_model_start", "on_llm_start"):
+                    extractor = FinalAnswerExtractor()
+                elif kind in ("on_chat_model_stream", "on_llm_stream"):
+                    text = self._chunk_text(event["data"]["chunk"])
+                    answer = extractor.feed(text) if text else ""
+                    if answer:
+                        events.put(StreamEvent("answer", answer))
+                elif kind == "on_tool_start":
+                    events.put(StreamEvent("status", f"Using {event['name']}..."))
+                elif kind == "on_chain_end" and event["run_id"] == root_id:
+                    output = (event["data"].get("output") or {}).get("output")
+            return output
+        finally:
+            events.put(None)
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Get the text of a streamed model chunk; chat chunks carry content, possibly as a list of parts"""
+        content = getattr(chunk, "content", None)
+        if content is None:
+            content = getattr(chunk, "text", chunk)
+        if isinstance(content, str):
+            return content
+        return "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content or []
+        )
+
+    def _answer_cache_key(self, request: RequestContext) -> Tuple[Optional[str], float]:
+        """
+        Build the answer-cache key (location, absolute date span, hour offset, time bucket) for a plain lookup.
+
+        The TTL follows the freshness of the data behind the answer. Returns (None, 0)
+        for open-ended questions, whose answers depend on the exact wording, and for
+        prompts that do not name exactly one known city: a multi-city answer would be
+        served for its first city, and LLM or IP locations are guesses.
+        """
+        if not IntentRouter.is_simple_lookup(request.prompt) or not request.location:
+            return None, 0
+        if request.location_source != "gazetteer":
+            return None, 0
+        # Direct answers are rendered from a template; only agent answers read the chat memory
+        direct = Config.ROUTER_ENABLED and request.location_source in Config.ROUTER_TRUSTED_SOURCES
+        if request.history and not direct:
+            return None, 0
+        if len(set(Gazetteer.default().find_all(request.prompt))) != 1:
+            return None, 0
+        
+        span = request.date_span
+        date = span.start.isoformat()
+        
+        today = datetime.now().date().isoformat()
+        if date == today:
+            ttl = Config.CURRENT_WEATHER_TTL
+        elif date > today:
+            ttl = Config.FORECAST_TTL
+        else:
+            ttl = Config.ANSWER_CACHE_HISTORICAL_TTL
+        
+        bucket = int(time.time() // ttl)
+        return f"{normalize_location(request.location)}|{date}|{span.end.isoformat()}|{span.hours_offset}|{bucket}", ttl
+
+    def _log_query(self, request: RequestContext, response: str):
+        """Record an answered request in the query log without failing the request"""
+        try:
+            self.db.save_query(
+                input_str=request.prompt,
+                response=response,
+                location=request.location,
+                date=request.date,
+                sentiment=request.sentiment
+            )
+        except Exception as e:
+            print(f"Error saving query: {e}")
+
+    def _remember(self, request: RequestContext, response: str):
+        """Hand the finished turn to the conversation memory"""
+        if request.chat_id:
+            self.memory.update(request.chat_id, request.history + [
+                {"role": "user", "content": request.prompt},
+                {"role": "assistant", "content": response}
+            ])
 
-    def _get_context(self, prompt: str) -> str:
+    def _get_context(self, request: RequestContext) -> str:
         """Get relevant context from history with sentiment filtering"""
         try:
-            location = self._extract_location(prompt)
+            location = request.location
             if not location:
                 return ""
                 
-            current_sentiment = TextBlob(prompt).sentiment.polarity
+            current_sentiment = request.sentiment
             
             # Get relevant historical queries
             history = self.db.get_recent_queries(
@@ -1,87 +1,133 @@
-import requests
+import asyncio
+import httpx
+from http_client import AsyncHttpClient, run_sync
+from forecast import ForecastIndex
+from cache import TTLCache, SqliteCacheBackend, GeocodeCache, RateLimiter, HistoricalWeatherStore, normalize_location
 from datetime import datetime, timedelta
 from config import Config
 from typing import Optional, Tuple
 from typing import Optional, Tuple
 from config import Config
-from typing import Dict, Optional
-import re
+from typing import Dict, List, Optional
+from dataclasses import dataclass, asdict
+
+# Shared across all sessions in the process; optionally backed by a file other workers can read
+_response_cache = TTLCache(
+    maxsize=Config.RESPONSE_CACHE_MAXSIZE,
+    backend=SqliteCacheBackend(
+        Config.RESPONSE_CACHE_PATH, purge_every=Config.RESPONSE_CACHE_PURGE_EVERY
+    ) if Config.RESPONSE_CACHE_PATH else None
+)
+_geocode_cache = GeocodeCache(Config.DB_PATH, hot_size=Config.GEOCODE_HOT_CACHE_SIZE)
+_nominatim_limiter = RateLimiter(Config.NOMINATIM_MIN_INTERVAL)
+_historical_store = HistoricalWeatherStore(Config.DB_PATH)
+# Parsed views of cached forecast payloads; in-process only since an index is not JSON-serializable
+_forecast_index_cache = TTLCache(maxsize=Config.RESPONSE_CACHE_MAXSIZE)
+
+@dataclass(slots=True)
+class HistoricalWeather:
+    """Daily historical weather summary for a city"""
+    city: Optional[str]
+    date: str
+    max_temp: float
+    min_temp: float
+    avg_temp: float
+    max_wind: float
+    total_precip: float
+    avg_humidity: float
+    condition: str
+
+    @classmethod
+    def from_day(cls, city: Optional[str], date_str: str, day: dict) -> "HistoricalWeather":
+        """Build a record from WeatherAPI's forecastday[...]["day"] payload"""
+        return cls(
+            city=city,
+            date=date_str,
+            max_temp=day["maxtemp_c"],
+            min_temp=day["mintemp_c"],
+            avg_temp=day["avgtemp_c"],
+            max_wind=day["maxwind_kph"],
+            total_precip=day["totalprecip_mm"],
+            avg_humidity=day["avghumidity"],
+            condition=day["condition"]["text"]
+        )
+
+    def render(self) -> str:
+        """Render the record as a human-readable summary"""
+        return (
+            f"📅 Historical weather in {self.city} on {self.date}:\n"
+            f"🌡️ Max Temp: {self.max_temp}°C\n"
+            f"🌡️ Min Temp: {self.min_temp}°C\n"
+            f"🌡️ Avg Temp: {self.avg_temp}°C\n"
+            f"🌬️ Max Wind Speed: {self.max_wind} kph\n"
+            f"💧 Total Precipitation: {self.total_precip} mm\n"
+            f"💧 Avg Humidity: {self.avg_humidity}%\n"
+            f"📖 Condition: {self.condition}"
+        )
+
 class WeatherFunctions:
+    """
+    Synchronous weather provider API.
+
+    Network lookups are run on AsyncWeatherFunctions through the shared background event
+    loop, so caching and error handling live in one place. Request building and response
+    parsing are the underscore helpers below.
+    """
+
+    # Relative day labels understood by the forecast views
+    DAY_OFFSETS = {"yesterday": -1, "today": 0, "tomorrow": 1, "day after tomorrow": 2}
+
     @staticmethod
-    def get_current_weather(location: str) -> dict:
-        """Get current weather data for a location"""
+    def cache_stats() -> dict:
+        """Get hit/miss counters of the response cache"""
+        return _response_cache.stats()
+
+    @staticmethod
+    def _current_weather_request(location: str) -> Tuple[str, dict]:
         url = f"{Config.WEATHER_BASE_URL}/weather"
         params = {
             "q": location,
             "appid": Config.OPENWEATHER_API_KEY,
             "units": "metric"
         }
-        
-        try:
-            response = requests.get(url, params=params)
-            return response.json() if response.status_code == 200 else None
-        except requests.RequestException:
-            return None
-    
+        return url, params
+
     @staticmethod
-    def get_weather_forecast(location: str) -> dict:
-        """Get weather forecast for a location"""
+    def _forecast_request(location: str) -> Tuple[str, dict]:
         url = f"{Config.WEATHER_BASE_URL}/forecast"
         params = {
             "q": location,
             "appid": Config.OPENWEATHER_API_KEY,
             "units": "metric",
-            "cnt": Config.FORECAST_CNT
+            "cnt": Config.FORECAST_FULL_CNT if Config.UNIFIED_FORECAST else Config.FORECAST_CNT
         }
-        
-        try:
-            response = requests.get(url, params=params)
-            return response.json() if response.status_code == 200 else None
-        except requests.RequestException:
-            return None
-    @staticmethod
-    def get_location_from_ip() -> Tuple[Optional[str], Optional[str]]:
-        """Get city and country from IP address using ipinfo.io"""
-        try:
-            res = requests.get("https://ipinfo.io/json", timeout=5)
-            res.raise_for_status()  # Raise HTTPError if not 200
-            data = res.json()
-            city = data.get("city")
-            country = data.get("country")
-            if not city or not country:
-                print("Warning: Incomplete location data:", data)
-            return city, country
-        except requests.exceptions.RequestException as e:
-            print("Network or HTTP error:", e)
-        except ValueError as e:
-            print("JSON decode error:", e)
-        except Exception as e:
-            print("Unexpected error:", e)
-        return None, None
-    @staticmethod
-    def get_historical_weather(city: Optional[str] = None, target_date: Optional[datetime] = None, api_key: Optional[str] = None) -> str:
-        """
-        Get detailed historical weather for a city on a specific date.
+        return url, params
 
-        If city is None, attempts to get location from IP.
-        If target_date is None, defaults to yesterday.
-        """
-        print("get_historical_weather called")
+    @staticmethod
+    def _parse_ip_location(data: dict) -> Tuple[Optional[str], Optional[str]]:
+        city = data.get("city")
+        country = data.get("country")
+        if not city or not country:
+            print("Warning: Incomplete location data:", data)
+        return city, country
 
+    @staticmethod
+    def _historical_target(target_date: Optional[datetime]) -> Optional[str]:
+        """Get the ISO date to query, or None if the date is not in the past"""
         # Default target_date if not provided: yesterday (historical data can't be today or future)
         if target_date is None:
             target_date = datetime.now() - timedelta(days=1)
 
-        # Format date for WeatherAPI: yyyy-mm-dd
-        date_str = target_date.strftime("%Y-%m-%d")
-
         # Make sure the target date is not in the future or today
         if target_date.date() >= datetime.now().date():
-            return "❌ Historical data is only available for past dates (not today or future)."
+            print("Historical data is only available for past dates (not today or future).")
+            return None
 
-        print(f"City: {city}")
-        print(f"Date: {date_str}")
+        # Format date for WeatherAPI: yyyy-mm-dd
+        return target_date.strftime("%Y-%m-%d")
 
+    @staticmethod
+    def _historical_request(city: Optional[str], date_str: str) -> Tuple[str, dict]:
         url = "http://api.weatherapi.com/v1/history.json"
         params = {
             "key": Config.ANOTHERAPI_KEY,
@@ -90,104 +136,146 @@ class WeatherFunctions:
             "aqi": "no",
             "alerts": "no"
         }
+        return url, params
 
+    @staticmethod
+    def _parse_historical_day(data: dict) -> Optional[dict]:
+        if "forecast" not in data or not data["forecast"].get("forecastday"):
+            return None
+        return data["forecast"]["forecastday"][0]["day"]
+
+    @staticmethod
+    def _is_day_over(data: dict, date_str: str) -> bool:
+        """
+        Check whether a day has ended in the city's local time, so its summary can no longer change.
+
+        Uses WeatherAPI's location.localtime; without it, only days at least two days
+        before today in UTC count as over, which holds in every time zone.
+        """
+        localtime = (data.get("location") or {}).get("localtime")
         try:
-            res = requests.get(url, params=params)
-            data = res.json()
-            print(f"API response: {data}")
-
-            if "forecast" not in data or "forecastday" not in data["forecast"]:
-                return f"❌ No historical weather data found for {city} on {date_str}."
-
-            day_data = data["forecast"]["forecastday"][0]["day"]
-
-            max_temp = day_data["maxtemp_c"]
-            min_temp = day_data["mintemp_c"]
-            avg_temp = day_data["avgtemp_c"]
-            max_wind = day_data["maxwind_kph"]
-            total_precip = day_data["totalprecip_mm"]
-            avg_humidity = day_data["avghumidity"]
-            condition = day_data["condition"]["text"]
-
-            print(f"Max Temp: {max_temp}°C")
-            print(f"Min Temp: {min_temp}°C")
-            print(f"Avg Temp: {avg_temp}°C")
-            print(f"Max Wind: {max_wind} kph")
-            print(f"Total Precipitation: {total_precip} mm")
-            print(f"Avg Humidity: {avg_humidity}%")
-            print(f"Condition: {condition}")
-
-            return (
-                f"📅 Historical weather in {city} on {date_str}:\n"
-                f"🌡️ Max Temp: {max_temp}°C\n"
-                f"🌡️ Min Temp: {min_temp}°C\n"
-                f"🌡️ Avg Temp: {avg_temp}°C\n"
-                f"🌬️ Max Wind Speed: {max_wind} kph\n"
-                f"💧 Total Precipitation: {total_precip} mm\n"
-                f"💧 Avg Humidity: {avg_humidity}%\n"
-                f"📖 Condition: {condition}"
-            )
+            local_date = datetime.strptime(localtime, "%Y-%m-%d %H:%M").date()
+        except (TypeError, ValueError):
+            return date_str <= (datetime.utcnow().date() - timedelta(days=2)).isoformat()
+        return date_str < local_date.isoformat()
 
-        except Exception as e:
-            print(f"Exception: {e}")
-            return "❌ Error retrieving historical weather."
     @staticmethod
-    def process_weather_response_historical(response: str) -> Optional[Dict[str, str]]:
+    def _geocode_request(city_name: str) -> Tuple[str, dict]:
+        geocode_url = "https://nominatim.openstreetmap.org/search"
+        params = {
+            "q": city_name,
+            "format": "json",
+            "limit": 1
+        }
+        return geocode_url, params
+
+    @staticmethod
+    def _parse_geocode(city_name: str, results: list) -> Optional[Tuple[float, float]]:
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+    @staticmethod
+    def _hourly_request(coordinates: Tuple[float, float], hours_before: int, hours_after: int) -> Tuple[str, dict]:
+        latitude, longitude = coordinates
+        now = datetime.utcnow()
+        start_date = (now - timedelta(hours=hours_before)).strftime("%Y-%m-%dT%H:%M")
+        end_date = (now + timedelta(hours=hours_after)).strftime("%Y-%m-%dT%H:%M")
+
+        weather_url = "https://api.open-meteo.com/v1/forecast"
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": "temperature_2m,relative_humidity_2m,wind_speed_10m,precipitation",
+            "start_hour": start_date,
+            "end_hour": end_date,
+            "timezone": "auto"
+        }
+        return weather_url, params
+
+    @staticmethod
+    def _parse_hourly(data: dict) -> dict:
+        return {
+            "time": data["hourly"]["time"],
+            "temperature_2m": data["hourly"]["temperature_2m"],
+            "humidity": data["hourly"]["relative_humidity_2m"],
+            "wind_speed": data["hourly"]["wind_speed_10m"],
+            "precipitation": data["hourly"]["precipitation"]
+        }
+
+    @staticmethod
+    def get_current_weather(location: str) -> dict:
+        """Get current weather data for a location"""
+        return run_sync(AsyncWeatherFunctions.get_current_weather(location))
+    
+    @staticmethod
+    def get_weather_forecast(location: str) -> dict:
+        """Get weather forecast for a location"""
+        return run_sync(AsyncWeatherFunctions.get_weather_forecast(location))
+    @staticmethod
+    def get_current_weather_batch(locations: List[str], max_concurrency: Optional[int] = None) -> Dict[str, dict]:
+        """
+        Get current weather for many locations concurrently.
+
+        Returns:
+            dict: {normalized location: {"data": dict | None, "error": str | None}}
+        """
+        return run_sync(AsyncWeatherFunctions.get_current_weather_batch(locations, max_concurrency))
+    @staticmethod
+    def get_location_from_ip() -> Tuple[Optional[str], Optional[str]]:
+        """Get city and country from IP address using ipinfo.io"""
+        return run_sync(AsyncWeatherFunctions.get_location_from_ip())
+    @staticmethod
+    def get_historical_weather(city: Optional[str] = None, target_date: Optional[datetime] = None, api_key: Optional[str] = None) -> Optional[HistoricalWeather]:
+        """
+        Get detailed historical weather for a city on a specific date.
+
+        If target_date is None, defaults to yesterday.
+        Returns None for today/future dates or when no data is available.
+        """
+        return run_sync(AsyncWeatherFunctions.get_historical_weather(city, target_date))
+    @staticmethod
+    def prefill_historical_weather(city: str, days: int = 7) -> int:
         """
-        Process the historical weather response string into a structured dictionary.
+        Pre-fill the historical store with the last `days` past days for a city.
+
+        Days that have not yet ended in the city's local time are not stored.
+
+        Returns:
+            int: Number of days stored (already stored days are skipped).
+        """
+        today = datetime.now().date()
+        records = []
+        for offset in range(1, days + 1):
+            date_str = (today - timedelta(days=offset)).strftime("%Y-%m-%d")
+            if _historical_store.has(city, date_str):
+                continue
+            try:
+                day_data, final = run_sync(AsyncWeatherFunctions._fetch_historical_day(city, date_str))
+            except Exception as e:
+                print(f"Error pre-filling {city} on {date_str}: {e}")
+                continue
+            if day_data is not None and final:
+                records.append((city, date_str, day_data))
+        _historical_store.bulk_load(records)
+        return len(records)
+    @staticmethod
+    def process_weather_response_historical(record: Optional[HistoricalWeather]) -> Optional[Dict[str, object]]:
+        """
+        Convert a historical weather record into a plain dictionary with numeric values.
         
         Args:
-            response: The string response from get_historical_weather function
+            record: The record returned by get_historical_weather
             
         Returns:
-            A dictionary with weather data if successful, None if the response indicates an error
+            A dictionary with weather data if successful, None if no record is available
         """
-        # Check for error responses
-        if response.startswith("❌"):
-            return None
-        
-        # Initialize result dictionary
-        weather_data = {}
-        
-        try:
-            # Extract city and date from the first line
-            first_line = response.split('\n')[0]
-            city_match = re.search(r'in (.+?) on', first_line)
-            date_match = re.search(r'on (\d{4}-\d{2}-\d{2})', first_line)
-            
-            if city_match:
-                weather_data['city'] = city_match.group(1)
-            if date_match:
-                weather_data['date'] = date_match.group(1)
-            
-            # Extract all weather metrics
-            metrics = {
-                'Max Temp': 'max_temp',
-                'Min Temp': 'min_temp',
-                'Avg Temp': 'avg_temp',
-                'Max Wind Speed': 'max_wind',
-                'Total Precipitation': 'total_precip',
-                'Avg Humidity': 'avg_humidity',
-                'Condition': 'condition'
-            }
-            
-            for line in response.split('\n')[1:]:
-                for display_name, key in metrics.items():
-                    if display_name in line:
-                        # Extract the value after the colon
-                        value = line.split(': ')[1]
-                        weather_data[key] = value
-                        break
-            
-            return weather_data
-        
-        except Exception as e:
-            print(f"Error processing weather response: {e}")
-            return None
+        return asdict(record) if record is not None else None
     @staticmethod
     def get_coordinates(city_name: str) -> tuple[float, float] | None:
         """
         Get latitude and longitude for a given city name using the Nominatim API.
+        Results are cached persistently; cache misses are throttled to Nominatim's rate limit.
         
         Args:
             city_name (str): Name of the city.
@@ -195,26 +283,7 @@ class WeatherFunctions:
         Returns:
             tuple: (latitude, longitude) or None if lookup fails.
         """
-        geocode_url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            "q": city_name,
-            "format": "json",
-            "limit": 1
-        }
-
-
-        try:
-            response = requests.get(geocode_url, params=params, headers={"User-Agent": "weather-app"})
-            response.raise_for_status()
-            results = response.json()
-            if results:
-                lat = float(results[0]["lat"])
-                lon = float(results[0]["lon"])
-                return lat, lon
-            else:
-                return None
-        except requests.exceptions.RequestException:
-            return None
+        return run_sync(AsyncWeatherFunctions.get_coordinates(city_name))
 
     def get_hourly_weather(self,city_name: str, hours_before: int = 3, hours_after: int = 3) -> dict:
         """
@@ -228,51 +297,89 @@ class WeatherFunctions:
         Returns:
             dict: Weather data or error message.
         """
-        coordinates = self.get_coordinates(city_name)
-        if coordinates is None:
-            return {"error": f"Could not find coordinates for city: {city_name}"}
-
-        latitude, longitude = coordinates
-        now = datetime.utcnow()
-        start_date = (now - timedelta(hours=hours_before)).strftime("%Y-%m-%dT%H:%M")
-        end_date = (now + timedelta(hours=hours_after)).strftime("%Y-%m-%dT%H:%M")
-
-        weather_url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "temperature_2m,relative_humidity_2m,wind_speed_10m,precipitation",
-            "start_hour": start_date,
-            "end_hour": end_date,
-            "timezone": "auto"
-        }
+        return run_sync(AsyncWeatherFunctions.get_hourly_weather(city_name, hours_before, hours_after))
+    @staticmethod
+    def get_forecast_index(location: str) -> Optional[ForecastIndex]:
+        """Get the forecast for a location as a time index, parsing each cached payload only once"""
+        cache_key = f"forecast:{normalize_location(location)}"
+        index = _forecast_index_cache.get(cache_key)
+        if index is not None:
+            return index
 
+        data = WeatherFunctions.get_weather_forecast(location)
+        if not data:
+            return None
+        index = ForecastIndex.from_payload(data)
+        # Expire together with the payload, which may have been cached (or shared) long before parsing
+        ttl = _response_cache.remaining_ttl(cache_key)
+        if ttl > 0:
+            _forecast_index_cache.set(cache_key, index, ttl)
+        return index
+    @staticmethod
+    def is_forecast_date(date: str) -> bool:
+        """Check whether a date label or ISO date can be answered from the forecast"""
+        if date in WeatherFunctions.DAY_OFFSETS:
+            return WeatherFunctions.DAY_OFFSETS[date] >= 0
         try:
-            response = requests.get(weather_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            hourly_data = {
-                "time": data["hourly"]["time"],
-                "temperature_2m": data["hourly"]["temperature_2m"],
-                "humidity": data["hourly"]["relative_humidity_2m"],
-                "wind_speed": data["hourly"]["wind_speed_10m"],
-                "precipitation": data["hourly"]["precipitation"]
-            }
-            return hourly_data
-
-        except requests.exceptions.RequestException as e:
-            return {"error": f"API request failed: {str(e)}"}
-        except KeyError:
-            return {"error": "Unexpected API response format"}
+            days_ahead = (datetime.strptime(date, "%Y-%m-%d").date() - datetime.now().date()).days
+        except (TypeError, ValueError):
+            return False
+        return 0 <= days_ahead <= 5
     @staticmethod
-    def process_weather_data(data: dict, date: str = "today", hours_offset: int = 0) -> str:
-        """Process weather data into human-readable format"""
+    def get_forecast_view(location: str, date: str = "today", hours_offset: int = 0) -> str:
+        """
+        Answer now, +N hours, tomorrow and later days from one cached full 5-day forecast.
+        
+        Current conditions are fetched only when neither a cached current reading nor a
+        forecast slot close enough to now is available.
+        """
+        if date == "today" and hours_offset == 0:
+            key = normalize_location(location)
+            current = _response_cache.get(f"weather:{key}")
+            if current is not None:
+                return WeatherFunctions.process_weather_data(current)
+            index = _forecast_index_cache.get(f"forecast:{key}")
+            if index is not None and index.nearest(datetime.now(), Config.FORECAST_NOW_TOLERANCE) is not None:
+                return WeatherFunctions.process_weather_data(index)
+            return WeatherFunctions.process_weather_data(WeatherFunctions.get_current_weather(location))
+        
+        return WeatherFunctions.process_weather_data(
+            WeatherFunctions.get_forecast_index(location), date, hours_offset
+        )
+    @staticmethod
+    def _render_point(city: str, point: dict) -> str:
+        return (
+            f"Weather in {city} at {point['time'].strftime('%Y-%m-%d %H:%M')}:\n"
+            f"- Condition: {point['condition'].capitalize()}\n"
+            f"- Temperature: {point['temp']}°C (feels like {point['feels_like']}°C)\n"
+            f"- Humidity: {point['humidity']}%\n"
+            f"- Wind: {point['wind']} m/s"
+        )
+    @staticmethod
+    def _render_day(city: str, label: str, summary: dict) -> str:
+        heading = f"{label} ({summary['date'].isoformat()})" if label else f"on {summary['date'].isoformat()}"
+        return (
+            f"Weather forecast for {city} {heading}:\n"
+            f"- Condition: {summary['condition'].capitalize()}\n"
+            f"- Temperature: {summary['temp_min']}°C to {summary['temp_max']}°C (average {summary['temp_mean']}°C)\n"
+            f"- Humidity: {summary['humidity_mean']}%\n"
+            f"- Wind: up to {summary['wind_max']} m/s"
+        )
+    @staticmethod
+    def process_weather_data(data, date: str = "today", hours_offset: int = 0) -> str:
+        """Process a current-weather payload, forecast payload or ForecastIndex into human-readable format"""
         if not data:
             return "Could not retrieve weather data."
         
+        if isinstance(data, ForecastIndex):
+            index = data
+        elif "list" in data:
+            index = ForecastIndex.from_payload(data)
+        else:
+            index = None
+        
         if date == "today":
-            if hours_offset == 0:
+            if hours_offset == 0 and index is None:
                 weather = data["weather"][0]
                 main = data["main"]
                 wind = data["wind"]
@@ -284,53 +391,187 @@ class WeatherFunctions:
                     f"- Humidity: {main['humidity']}%\n"
                     f"- Wind: {wind['speed']} m/s"
                 )
-            else:
-                target_time = datetime.now() + timedelta(hours=hours_offset)
-                for item in data.get("list", []):
-                    if datetime.fromtimestamp(item["dt"]) == target_time:
-                        weather = item["weather"][0]
-                        main = item["main"]
-                        wind = item["wind"]
-                        
-                        return (
-                            f"Weather in {data['city']['name']} at {target_time.strftime('%Y-%m-%d %H:%M')}:\n"
-                            f"- Condition: {weather['description'].capitalize()}\n"
-                            f"- Temperature: {main['temp']}°C (feels like {main['feels_like']}°C)\n"
-                            f"- Humidity: {main['humidity']}%\n"
-                            f"- Wind: {wind['speed']} m/s"
-                        )
+            point = index.at(datetime.now() + timedelta(hours=hours_offset)) if index else None
+            if point is None:
                 return "No weather data available for the specified time."
+            return WeatherFunctions._render_point(index.city, point)
+        
+        if index is None:
+            return "Could not retrieve weather data."
         
-        elif date == "yesterday":
-            target_date = (datetime.now() - timedelta(days=1)).date()
-            for item in data.get("list", []):
-                if datetime.fromtimestamp(item["dt"]).date() == target_date:
-                    weather = item["weather"][0]
-                    main = item["main"]
-                    wind = item["wind"]
-                    
-                    return (
-                        f"Weather for {data['city']['name']} yesterday:\n"
-                        f"- Condition: {weather['description'].capitalize()}\n"
-                        f"- Temperature: {main['temp']}°C (feels like {main['feels_like']}°C)\n"
-                        f"- Humidity: {main['humidity']}%\n"
-                        f"- Wind: {wind['speed']} m/s"
-                    )
-            return "No weather data available for yesterday."
+        if date in WeatherFunctions.DAY_OFFSETS:
+            label = date
+            target_day = index.local_today() + timedelta(days=WeatherFunctions.DAY_OFFSETS[date])
+        else:  # Actual date string
+            try:
+                label = ""
+                target_day = datetime.strptime(date, "%Y-%m-%d").date()
+            except (TypeError, ValueError):
+                return "Could not understand the requested date."
         
-        else:  # For forecast data (e.g., tomorrow)
-            target_date = (datetime.now() + timedelta(days=1)).date()
-            for item in data.get("list", []):
-                if datetime.fromtimestamp(item["dt"]).date() == target_date:
-                    weather = item["weather"][0]
-                    main = item["main"]
-                    wind = item["wind"]
-                    
-                    return (
-                        f"Weather forecast for {data['city']['name']} tomorrow:\n"
-                        f"- Condition: {weather['description'].capitalize()}\n"
-                        f"- Temperature: {main['temp']}°C (feels like {main['feels_like']}°C)\n"
-                        f"- Humidity: {main['humidity']}%\n"
-                        f"- Wind: {wind['speed']} m/s"
-                    )
-            return "No forecast data available for tomorrow."
\ No newline at end of file
+        summary = index.day_summary(target_day)
+        if summary is None:
+            return f"No forecast data available for {label or target_day.isoformat()}."
+        return WeatherFunctions._render_day(index.city, label, summary)
+
+class AsyncWeatherFunctions:
+    """
+    Asyncio-native weather provider API, and the implementation behind WeatherFunctions.
+
+    Network waits yield the event loop instead of holding a thread. Cache and store
+    lookups that may hit SQLite run in worker threads so they never block the loop.
+    """
+
+    @staticmethod
+    async def _cached_get(cache_key: str, request: Tuple[str, dict], ttl: float) -> Optional[dict]:
+        """Serve a provider response from the shared cache, fetching and caching it on a miss"""
+        cached = await asyncio.to_thread(_response_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+        url, params = request
+        try:
+            response = await AsyncHttpClient.get(url, params=params)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            await asyncio.to_thread(_response_cache.set, cache_key, data, ttl)
+            return data
+        except httpx.HTTPError:
+            return None
+
+    @staticmethod
+    async def get_current_weather(location: str) -> dict:
+        """Get current weather data for a location"""
+        return await AsyncWeatherFunctions._cached_get(
+            f"weather:{normalize_location(location)}",
+            WeatherFunctions._current_weather_request(location),
+            Config.CURRENT_WEATHER_TTL
+        )
+
+    @staticmethod
+    async def get_weather_forecast(location: str) -> dict:
+        """Get weather forecast for a location"""
+        return await AsyncWeatherFunctions._cached_get(
+            f"forecast:{normalize_location(location)}",
+            WeatherFunctions._forecast_request(location),
+            Config.FORECAST_TTL
+        )
+
+    @staticmethod
+    async def get_current_weather_batch(locations: List[str], max_concurrency: Optional[int] = None) -> Dict[str, dict]:
+        """
+        Get current weather for many locations with a bounded fan-out.
+
+        Repeated locations are fetched once. Each location gets its own result so one
+        failing city does not fail the whole batch.
+
+        Returns:
+            dict: {normalized location: {"data": dict | None, "error": str | None}}
+        """
+        unique = list(dict.fromkeys(
+            normalize_location(location) for location in locations if location and location.strip()
+        ))
+        semaphore = asyncio.Semaphore(max_concurrency or Config.BATCH_MAX_CONCURRENCY)
+
+        async def fetch(location: str) -> dict:
+            async with semaphore:
+                try:
+                    data = await AsyncWeatherFunctions.get_current_weather(location)
+                except Exception as e:
+                    return {"data": None, "error": str(e)}
+            if data is None:
+                return {"data": None, "error": f"Could not retrieve weather data for {location}."}
+            return {"data": data, "error": None}
+
+        results = await asyncio.gather(*(fetch(location) for location in unique))
+        return dict(zip(unique, results))
+
+    @staticmethod
+    async def get_location_from_ip() -> Tuple[Optional[str], Optional[str]]:
+        """Get city and country from IP address using ipinfo.io"""
+        try:
+            res = await AsyncHttpClient.get("https://ipinfo.io/json")
+            res.raise_for_status()
+            return WeatherFunctions._parse_ip_location(res.json())
+        except httpx.HTTPError as e:
+            print("Network or HTTP error:", e)
+        except ValueError as e:
+            print("JSON decode error:", e)
+        except Exception as e:
+            print("Unexpected error:", e)
+        return None, None
+
+    @staticmethod
+    async def get_historical_weather(city: Optional[str] = None, target_date: Optional[datetime] = None) -> Optional[HistoricalWeather]:
+        """Get detailed historical weather for a city on a specific date (defaults to yesterday)"""
+        date_str = WeatherFunctions._historical_target(target_date)
+        if date_str is None:
+            return None
+
+        try:
+            day_data = await asyncio.to_thread(_historical_store.get, city, date_str) if city else None
+            if day_data is None:
+                day_data, final = await AsyncWeatherFunctions._fetch_historical_day(city, date_str)
+                if day_data is None:
+                    print(f"No historical weather data found for {city} on {date_str}.")
+                    return None
+                # A day still in progress in the city's time zone is served but not stored forever
+                if city and final:
+                    await asyncio.to_thread(_historical_store.put, city, date_str, day_data)
+
+            return HistoricalWeather.from_day(city, date_str, day_data)
+
+        except Exception as e:
+            print(f"Error retrieving historical weather: {e}")
+            return None
+
+    @staticmethod
+    async def _fetch_historical_day(city: Optional[str], date_str: str) -> Tuple[Optional[dict], bool]:
+        """
+        Fetch the daily summary for a past date from WeatherAPI's history endpoint.
+
+        Also reports whether the day is over in the city's local time and safe to store.
+        """
+        url, params = WeatherFunctions._historical_request(city, date_str)
+        res = await AsyncHttpClient.get(url, params=params)
+        data = res.json()
+        return WeatherFunctions._parse_historical_day(data), WeatherFunctions._is_day_over(data, date_str)
+
+    @staticmethod
+    async def get_coordinates(city_name: str) -> Optional[Tuple[float, float]]:
+        """Get latitude and longitude for a city, honouring the shared Nominatim rate limit"""
+        coordinates = await asyncio.to_thread(_geocode_cache.get, city_name)
+        if coordinates is not None:
+            return coordinates
+
+        geocode_url, params = WeatherFunctions._geocode_request(city_name)
+        try:
+            delay = _nominatim_limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = await AsyncHttpClient.get(geocode_url, params=params)
+            response.raise_for_status()
+            coordinates = WeatherFunctions._parse_geocode(city_name, response.json())
+        except httpx.HTTPError:
+            return None
+        if coordinates is not None:
+            await asyncio.to_thread(_geocode_cache.set, city_name, coordinates)
+        return coordinates
+
+    @staticmethod
+    async def get_hourly_weather(city_name: str, hours_before: int = 3, hours_after: int = 3) -> dict:
+        """Fetch hourly weather data for a given city using Open-Meteo's API"""
+        coordinates = await AsyncWeatherFunctions.get_coordinates(city_name)
+        if coordinates is None:
+            return {"error": f"Could not find coordinates for city: {city_name}"}
+
+        weather_url, params = WeatherFunctions._hourly_request(coordinates, hours_before, hours_after)
+        try:
+            response = await AsyncHttpClient.get(weather_url, params=params)
+            response.raise_for_status()
+            return WeatherFunctions._parse_hourly(response.json())
+        except httpx.HTTPError as e:
+            return {"error": f"API request failed: {str(e)}"}
+        except KeyError:
+            return {"error": "Unexpected API response format"}